@@ -2,3 +2,34 @@ from EtsyScraperLib.store import Store
 from EtsyScraperLib.product import Product
 from EtsyScraperLib.text_format import format_title
 from EtsyScraperLib.text_format import format_description
+from EtsyScraperLib.transport import Transport
+from EtsyScraperLib.cache import DiskCache
+from EtsyScraperLib.parsing import set_default_parser
+from EtsyScraperLib.parsing import set_restricted_parsing
+from EtsyScraperLib.batch import scrape_products
+from EtsyScraperLib.batch import scrape_store_products
+from EtsyScraperLib.index import ListingIndex
+from EtsyScraperLib.batch import replay_products
+from EtsyScraperLib.archive import ResponseArchive
+from EtsyScraperLib.archive import ArchiveMiss
+from EtsyScraperLib.records import Listing
+from EtsyScraperLib.records import ListingColumns
+from EtsyScraperLib.records import StoreSnapshot
+from EtsyScraperLib.incremental import StoreDiff
+from EtsyScraperLib.export import NDJSONWriter
+from EtsyScraperLib.export import CSVWriter
+from EtsyScraperLib.export import open_writer
+from EtsyScraperLib.ratelimit import RateLimiter
+from EtsyScraperLib.ratelimit import RetryPolicy
+from EtsyScraperLib.instrumentation import metrics
+from EtsyScraperLib.instrumentation import add_hook
+from EtsyScraperLib.instrumentation import remove_hook
+from EtsyScraperLib.scheduler import CrawlScheduler
+from EtsyScraperLib.scheduler import CrawlCheckpoint
+from EtsyScraperLib.database import ResultDatabase
+from EtsyScraperLib.prices import PriceColumn
+from EtsyScraperLib.prices import parse_price
+from EtsyScraperLib.prices import price_summary
+from EtsyScraperLib.prices import price_histogram
+from EtsyScraperLib.prices import price_deltas
+from EtsyScraperLib.media import MediaStore
@@ -0,0 +1,247 @@
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import threading
+from typing import Dict, Iterator, Optional
+import requests
+from EtsyScraperLib.instrumentation import increment, logger
+
+
+RECORD_MAGIC = b'ESA1'
+RECORD_HEADER = struct.Struct('<4sIIB') # magic, metadata length, body length, whether the body is compressed
+INDEX_SUFFIX = '.idx'
+
+
+class ArchiveMiss(requests.exceptions.ConnectionError):
+    """
+    Raised when replaying from an archive that doesn't hold the requested URL.
+    """
+
+
+class ResponseArchive:
+    def __init__(self, path: str, compress_level: int = 6):
+        """
+        An append-only file of raw HTTP responses, so pages can be extracted again later without the network.
+        Each record is a fixed-size header, a JSON line of metadata and the body. A side file maps each URL to the
+        offset of its latest record, and records are read back through a memory map of the archive.
+        Args:
+            path: The archive file, it is created on the first write. The index is kept next to it at '<path>.idx'
+            compress_level: zlib compression level used for stored bodies, 0 stores them uncompressed.
+        """
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.compress_level = compress_level
+        self.__offsets: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+        self.__file = None
+        self.__index = None
+        self.__map: Optional[mmap.mmap] = None
+        self.__size = 0
+
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        offset, length, url = line.rstrip('\n').split('\t', 2)
+                        self.__offsets[url] = int(offset)
+                        indexed_end = max(indexed_end, int(offset) + int(length))
+                    except ValueError:
+                        continue # a line cut short by the process being killed
+
+        # records written after the index was last flushed are found by reading on from the last indexed record
+        self.__size = indexed_end
+        if os.path.exists(path) and os.path.getsize(path) > indexed_end:
+            self.__recover(indexed_end)
+
+
+    def __recover(self, start: int):
+        """
+        Index the records that follow a point in the archive, stopping at a record cut short by the process being killed.
+        Args:
+            start: The offset of the first unindexed record.
+        """
+        recovered = []
+        size = os.path.getsize(self.path)
+        with open(self.path, 'rb') as file:
+            file.seek(start)
+            offset = start
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                magic, meta_length, body_length, _ = RECORD_HEADER.unpack(header)
+                if magic != RECORD_MAGIC:
+                    break
+                meta = file.read(meta_length)
+                file.seek(body_length, os.SEEK_CUR)
+                length = RECORD_HEADER.size + meta_length + body_length
+                if len(meta) < meta_length or file.tell() > size:
+                    break
+                try:
+                    url = json.loads(meta)['url']
+                except (ValueError, KeyError, TypeError):
+                    break
+                self.__offsets[url] = offset
+                recovered.append((offset, length, url))
+                offset += length
+
+        self.__size = offset
+        if recovered:
+            logger.info('Recovered %d unindexed records from %s', len(recovered), self.path)
+            with open(self.index_path, 'a', encoding='utf-8') as index:
+                index.writelines(f'{offset}\t{length}\t{url}\n' for offset, length, url in recovered)
+
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.__offsets
+
+
+    def __len__(self) -> int:
+        return len(self.__offsets)
+
+
+    def add(self, url: str, body: bytes, status: int = 200, content_type: Optional[str] = None,
+            encoding: Optional[str] = None) -> int:
+        """
+        Append a response to the archive, it replaces any earlier record of the same URL.
+        Args:
+            url: The URL that was requested.
+            body: The raw response body.
+            status: The response status code.
+            content_type: The response 'Content-Type' header.
+            encoding: The text encoding requests detected for the body.
+        Returns:
+            Integer offset of the record in the archive.
+        """
+        compressed = self.compress_level > 0
+        stored = zlib.compress(body, self.compress_level) if compressed else bytes(body)
+        meta = json.dumps({
+            'url': url,
+            'status': status,
+            'content_type': content_type,
+            'encoding': encoding,
+            'recorded_at': time.time()
+        }).encode('utf-8')
+        record = RECORD_HEADER.pack(RECORD_MAGIC, len(meta), len(stored), compressed) + meta + stored
+
+        with self.__lock:
+            if self.__file is None:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.__size:
+                    os.truncate(self.path, self.__size) # drop a record cut short by the process being killed
+                self.__file = open(self.path, 'ab')
+                self.__index = open(self.index_path, 'a', encoding='utf-8')
+
+            offset = self.__size
+            self.__file.write(record)
+            self.__file.flush()
+            self.__index.write(f'{offset}\t{len(record)}\t{url}\n')
+            self.__index.flush()
+            self.__size += len(record)
+            self.__offsets[url] = offset
+
+        increment('archive_records', url=url)
+        increment('archive_bytes', len(record), url=url)
+        return offset
+
+
+    def record(self, url: str, response: requests.Response) -> int:
+        """
+        Append a response returned by requests.
+        Args:
+            url: The URL that was requested.
+            response: The response, its body is read if it hasn't been already.
+        Returns:
+            Integer offset of the record in the archive.
+        """
+        return self.add(url, response.content, response.status_code, response.headers.get('Content-Type'),
+                        response.encoding)
+
+
+    def __mapped(self, end: int) -> mmap.mmap:
+        """
+        Get a memory map of the archive that reaches at least a given offset, remapping it if the archive has grown.
+        Args:
+            end: The offset the map has to reach.
+        Returns:
+            The memory map.
+        """
+        with self.__lock:
+            if self.__map is None or len(self.__map) < end:
+                # earlier maps are left for the garbage collector, another thread may still be reading from one
+                with open(self.path, 'rb') as file:
+                    self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.__map
+
+
+    def __read(self, offset: int) -> dict:
+        """
+        Read one record through the memory map.
+        Args:
+            offset: The offset of the record.
+        Returns:
+            Dictionary of the record's metadata with the decompressed 'body'
+        """
+        mapped = self.__mapped(offset + RECORD_HEADER.size)
+        _, meta_length, body_length, compressed = RECORD_HEADER.unpack_from(mapped, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + meta_length + body_length
+        if len(mapped) < end:
+            mapped = self.__mapped(end)
+
+        entry = json.loads(mapped[start:start + meta_length])
+        body = mapped[start + meta_length:end]
+        entry['body'] = zlib.decompress(body) if compressed else body
+        return entry
+
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Read the latest record of a URL.
+        Args:
+            url: The URL that was requested.
+        Returns:
+            Dictionary of 'url', 'status', 'content_type', 'encoding', 'recorded_at' and 'body', None if it isn't archived.
+        """
+        offset = self.__offsets.get(url)
+        if offset is None:
+            return None
+        return self.__read(offset)
+
+
+    def iter_records(self, contains: Optional[str] = None) -> Iterator[dict]:
+        """
+        Read the latest record of every URL in the order they were written, so the archive is read front to back.
+        Args:
+            contains: Only read URLs containing this text e.g. '/listing/' for product pages.
+        Yields:
+            Dictionary of each record, the same as 'get()'
+        """
+        with self.__lock:
+            offsets = sorted(offset for url, offset in self.__offsets.items() if contains is None or contains in url)
+        for offset in offsets:
+            yield self.__read(offset)
+
+
+    def close(self):
+        """
+        Close the archive and its index.
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__index.close()
+                self.__file = None
+                self.__index = None
+            self.__map = None
+
+
+    def __enter__(self) -> 'ResponseArchive':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
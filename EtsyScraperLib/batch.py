@@ -0,0 +1,323 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, Optional
+from EtsyScraperLib.product import Product
+from EtsyScraperLib.transport import Transport, get_default_transport
+from EtsyScraperLib.workers import parse_product_html, resolve_parsing
+from EtsyScraperLib.instrumentation import increment, logger
+from EtsyScraperLib.index import ListingIndex
+from EtsyScraperLib.archive import ResponseArchive
+
+
+QUEUE_POLL_SECONDS = 0.1
+_FINISHED = object() # marks the end of the URL queue, and a worker stopping on the result queue
+
+
+class ProductResult:
+    __slots__ = ('url', 'product', 'error')
+
+    def __init__(self, url: str, product: Optional[Product] = None, error: Optional[Exception] = None):
+        """
+        The outcome of scraping one product URL.
+        Args:
+            url: The product URL.
+            product: The scraped Product, None if it failed.
+            error: The exception raised while fetching or extracting, None if it succeeded.
+        """
+        self.url = url
+        self.product = product
+        self.error = error
+
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the product was scraped successfully.
+        """
+        return self.error is None
+
+
+def _scrape_product(url: str, transport: Transport, parser: Optional[str], restrict: Optional[bool],
+                    parse_executor: Optional[Executor]) -> Product:
+    """
+    Fetch a product page and extract all of its data, errors are raised rather than printed.
+    Args:
+        url: The product URL.
+        transport: The pooled HTTP transport to issue the request with.
+        parser: The BeautifulSoup4 backend.
+        restrict: Whether to only build the parts of the page data is extracted from.
+        parse_executor: An optional process pool the page is parsed and extracted in.
+    Returns:
+        The scraped Product.
+    """
+    product = Product(url, transport=transport, parser=parser, restrict=restrict)
+    request = transport.get(url)
+    request.raise_for_status()
+
+    if parse_executor is None:
+        product.load_html(request.text)
+        product.get_all_data()
+        return product
+
+    parser, restrict = resolve_parsing(parser, restrict)
+    record = parse_executor.submit(parse_product_html, request.content, url, parser, restrict).result()
+    return _load_record(product, record)
+
+
+def _load_record(product: Product, record: dict) -> Product:
+    """
+    Fill in a Product from the data 'parse_product_html()' extracted in another process.
+    Args:
+        product: The Product to fill in.
+        record: The extracted data.
+    Returns:
+        The Product.
+    """
+    product.title = record['title']
+    product.price = record['price']
+    product.currency = record['currency']
+    product.amount = record['amount']
+    product.description = record['description']
+    product.review_quantity = record['review_quantity']
+    product.media_urls = record['media_urls']
+    return product
+
+
+def _settle(index: Optional[ListingIndex], result: ProductResult):
+    """
+    Mark a claimed listing as scraped, or release it so a later attempt can fetch it again.
+    Args:
+        index: The ListingIndex the listing was claimed in, None if there isn't one.
+        result: The outcome of scraping the listing.
+    """
+    if index is None:
+        return
+    if result.ok:
+        index.complete(result.url)
+    else:
+        index.release(result.url)
+
+
+def scrape_products(product_urls: Iterable[str], max_workers: int = 8, transport: Optional[Transport] = None,
+                    parser: Optional[str] = None, restrict: Optional[bool] = None,
+                    parse_executor: Optional[Executor] = None, index: Optional[ListingIndex] = None) -> Iterator[ProductResult]:
+    """
+    Scrape many products across a pool of workers, yielding each result as soon as it completes.
+    URLs are pulled from the iterable lazily so at most 'max_workers' products are in flight at once.
+    Args:
+        product_urls: The product URLs to scrape e.g. the output of 'Store.parse_product_urls()'
+        max_workers: The maximum number of products fetched and extracted concurrently.
+        transport: The pooled HTTP transport to issue requests with, defaults to the process-wide transport.
+        parser: The BeautifulSoup4 backend e.g. 'lxml', defaults to the global parser.
+        restrict: Whether to only build the parts of each page data is extracted from, defaults to the global setting.
+        parse_executor: An optional process pool pages are parsed and extracted in, threads then only wait on the network.
+        index: An optional ListingIndex, URLs of listings already in it are skipped without a request and scraped
+            listings are added to it once they've been yielded. Closing the generator early releases the rest.
+    Yields:
+        ProductResult for every URL in completion order, except those skipped by the index.
+    """
+    transport = transport or get_default_transport()
+    max_workers = max(1, max_workers)
+    urls = iter(product_urls)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_next() -> bool:
+            for url in urls:
+                if index is not None and not index.claim(url):
+                    increment('duplicates_skipped', url=url)
+                    continue
+                pending[executor.submit(_scrape_product, url, transport, parser, restrict, parse_executor)] = url
+                return True
+            return False
+
+        while len(pending) < max_workers and submit_next():
+            pass
+
+        handed = None
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        result = ProductResult(url, product=future.result())
+                    except Exception as e:
+                        result = ProductResult(url, error=e)
+                    handed = result
+                    yield result
+                    handed = None
+                    _settle(index, result) # only once the caller has it
+                    submit_next()
+        finally:
+            if handed is not None:
+                _settle(index, handed) # the caller stopped after receiving it
+            # the caller stopped early, products still in flight are dropped so their claims are given up
+            for future, url in pending.items():
+                future.cancel()
+                if index is not None:
+                    index.release(url)
+
+
+def scrape_store_products(store, max_workers: int = 8, queue_size: Optional[int] = None,
+                          transport: Optional[Transport] = None, parser: Optional[str] = None,
+                          restrict: Optional[bool] = None, parse_executor: Optional[Executor] = None,
+                          index: Optional[ListingIndex] = None) -> Iterator[ProductResult]:
+    """
+    Scrape every product of a store while its listing pages are still being crawled, the store page is fetched first if it hasn't been.
+    A thread walks the listing pages with 'store.iter_products()' and pushes each product URL onto a bounded queue that
+    'max_workers' product workers pull from, so the two stages overlap instead of running one after the other.
+    When the product workers fall behind the queue fills and listing pages stop being fetched until there's room,
+    and when the caller stops reading results the workers wait, so memory stays bounded either way.
+    Args:
+        store: The connected Store, its 'max_workers' sets how many listing pages are fetched ahead.
+        max_workers: The number of products fetched and extracted concurrently.
+        queue_size: The most product URLs waiting between the stages, defaults to twice 'max_workers'
+        transport: The pooled HTTP transport products are fetched with, defaults to the store's transport.
+        parser: The BeautifulSoup4 backend, defaults to the store's parser.
+        restrict: Whether to only build the parts of each page data is extracted from, defaults to the store's setting.
+        parse_executor: An optional process pool pages are parsed and extracted in, defaults to the store's pool.
+        index: An optional ListingIndex, listings already in it are skipped before they're queued and scraped
+            listings are added to it once they've been yielded. Closing the generator early releases the rest. Listings repeated across the store's pages are always only scraped once.
+    Yields:
+        ProductResult for every product in completion order. If the listing pages can't be walked a failed
+        ProductResult for the store's URL is yielded.
+    """
+    transport = transport or store.transport
+    parser = store.parser if parser is None else parser
+    restrict = store.restrict if restrict is None else restrict
+    parse_executor = store.parse_executor if parse_executor is None else parse_executor
+    max_workers = max(1, max_workers)
+
+    urls = queue.Queue(maxsize=max(1, queue_size or max_workers * 2))
+    results = queue.Queue(maxsize=max_workers)
+    stopped = threading.Event()
+
+    def put(target: queue.Queue, item) -> bool:
+        # blocks while the queue is full, but gives up once the caller has stopped reading results
+        while not stopped.is_set():
+            try:
+                target.put(item, timeout=QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def discover():
+        try:
+            for listing in store.iter_products():
+                if index is not None and not index.claim(listing.url):
+                    increment('duplicates_skipped', url=listing.url)
+                    continue
+                if not put(urls, listing.url):
+                    if index is not None:
+                        index.release(listing.url)
+                    return
+                increment('pipeline_urls_queued')
+        except Exception as e:
+            logger.error('Couldn\'t walk the listing pages of %s: %s', store.store_url, e)
+            put(results, ProductResult(store.store_url, error=e))
+        finally:
+            put(urls, _FINISHED)
+
+    def work():
+        try:
+            while not stopped.is_set():
+                try:
+                    url = urls.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    increment('pipeline_worker_waits') # the listing stage is the slower one
+                    continue
+
+                if url is _FINISHED:
+                    put(urls, _FINISHED) # leave it for the other workers
+                    return
+
+                try:
+                    result = ProductResult(url, product=_scrape_product(url, transport, parser, restrict, parse_executor))
+                except Exception as e:
+                    result = ProductResult(url, error=e)
+                if not put(results, result):
+                    if index is not None:
+                        index.release(url) # the caller stopped before it could be handed over
+                    return
+        finally:
+            put(results, _FINISHED)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers + 1) as executor:
+            executor.submit(discover)
+            for _ in range(max_workers):
+                executor.submit(work)
+
+            finished = 0
+            try:
+                while finished < max_workers:
+                    result = results.get()
+                    if result is _FINISHED:
+                        finished += 1
+                    else:
+                        _settle(index, result) # settled here rather than in the workers, once the caller has it
+                        yield result
+            finally:
+                stopped.set()
+    finally:
+        # URLs still queued and results never handed over when the caller stopped early were claimed but not delivered
+        for waiting in (urls, results):
+            while index is not None:
+                try:
+                    item = waiting.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _FINISHED:
+                    index.release(item if isinstance(item, str) else item.url)
+
+
+def replay_products(archive: ResponseArchive, parser: Optional[str] = None, restrict: Optional[bool] = None,
+                    parse_executor: Optional[Executor] = None, max_pending: int = 32) -> Iterator[ProductResult]:
+    """
+    Extract every product page in an archive again without the network, e.g. after a selector has been fixed.
+    Pages are read front to back through the archive's memory map, so throughput is bound by parsing alone.
+    Args:
+        archive: The ResponseArchive the product pages were recorded to.
+        parser: The BeautifulSoup4 backend e.g. 'lxml', defaults to the global parser.
+        restrict: Whether to only build the parts of each page data is extracted from, defaults to the global setting.
+        parse_executor: An optional process pool pages are parsed and extracted in, use one to extract on every core.
+        max_pending: The most pages handed to 'parse_executor' at once.
+    Yields:
+        ProductResult for every archived product page in archive order.
+    """
+    records = (record for record in archive.iter_records('/listing/') if record['status'] == 200)
+
+    if parse_executor is None:
+        for record in records:
+            url = record['url']
+            try:
+                product = Product(url, parser=parser, restrict=restrict)
+                product.load_html(record['body'])
+                product.get_all_data()
+                yield ProductResult(url, product=product)
+            except Exception as e:
+                yield ProductResult(url, error=e)
+        return
+
+    resolved_parser, resolved_restrict = resolve_parsing(parser, restrict)
+    pending = deque()
+
+    def collect(url: str, future) -> ProductResult:
+        try:
+            product = Product(url, parser=parser, restrict=restrict)
+            return ProductResult(url, product=_load_record(product, future.result()))
+        except Exception as e:
+            return ProductResult(url, error=e)
+
+    for record in records:
+        url = record['url']
+        pending.append((url, parse_executor.submit(parse_product_html, record['body'], url, resolved_parser, resolved_restrict)))
+        if len(pending) >= max(1, max_pending):
+            yield collect(*pending.popleft())
+    while pending:
+        yield collect(*pending.popleft())
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from typing import Optional
+from EtsyScraperLib.instrumentation import logger
+
+
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+CACHE_SUFFIX = '.cache'
+EVICT_TO = 0.9 # eviction frees space down to this fraction of 'max_size' so the next writes don't rescan the folder
+
+
+class DiskCache:
+    def __init__(self, directory: str, ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE, compress_level: int = 6):
+        """
+        Sets up a disk-backed HTTP response cache keyed by URL.
+        Args:
+            directory: The folder the cache files are written to, it is created if it doesn't exist.
+            ttl: Seconds an entry is served without asking Etsy whether it has changed.
+            max_size: The maximum bytes kept on disk, the least recently used entries are evicted past this.
+            compress_level: zlib compression level used for stored bodies.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compress_level = compress_level
+        self.__lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.__size = sum(os.path.getsize(path) for path in self.__entry_paths())
+
+
+    def __path(self, url: str) -> str:
+        """
+        Get the file path an entry is stored at.
+        Args:
+            url: The URL of the entry.
+        Returns:
+            String of the entry's file path.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+
+    def __entry_paths(self) -> list:
+        """
+        Get the file path of every entry in the cache.
+        Returns:
+            List of entry file paths.
+        """
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(CACHE_SUFFIX)]
+
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Read an entry from the cache, marking it as recently used.
+        Args:
+            url: The URL of the entry.
+        Returns:
+            Dictionary of the entry's metadata with the decompressed 'body', None if there's no usable entry.
+        """
+        path = self.__path(url)
+        try:
+            with open(path, 'rb') as file:
+                meta = json.loads(file.readline())
+                body = zlib.decompress(file.read())
+            os.utime(path) # mtime doubles as the LRU timestamp
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        meta['body'] = body
+        return meta
+
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Check whether an entry is still within its TTL.
+        Args:
+            entry: An entry returned by 'get()'.
+        Returns:
+            True if the entry can be served without revalidation.
+        """
+        return time.time() - entry.get('stored_at', 0) < self.ttl
+
+
+    def set(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            content_type: Optional[str] = None, encoding: Optional[str] = None):
+        """
+        Write an entry to the cache, evicting the least recently used entries if it has grown too big.
+        Args:
+            url: The URL of the entry.
+            body: The raw response body.
+            etag: The response 'ETag' header used for revalidation.
+            last_modified: The response 'Last-Modified' header used for revalidation.
+            content_type: The response 'Content-Type' header.
+            encoding: The text encoding of the body.
+        """
+        meta = {
+            'url': url,
+            'stored_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': content_type,
+            'encoding': encoding
+        }
+        self.__write(url, meta, zlib.compress(body, self.compress_level))
+
+
+    def touch(self, url: str, entry: dict):
+        """
+        Restart an entry's TTL after Etsy confirmed it hasn't changed.
+        Args:
+            url: The URL of the entry.
+            entry: The entry returned by 'get()'.
+        """
+        meta = {key: value for key, value in entry.items() if key != 'body'}
+        meta['stored_at'] = time.time()
+        self.__write(url, meta, zlib.compress(entry['body'], self.compress_level))
+
+
+    def __write(self, url: str, meta: dict, compressed: bytes):
+        """
+        Atomically write an entry file and keep the cache within its size limit.
+        Args:
+            url: The URL of the entry.
+            meta: The entry metadata.
+            compressed: The compressed body.
+        """
+        path = self.__path(url)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        data = json.dumps(meta).encode('utf-8') + b'\n' + compressed
+
+        with self.__lock:
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+
+            try:
+                with open(temp_path, 'wb') as file:
+                    file.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning('Couldn\'t write cache entry for %s: %s', url, e)
+                return
+
+            self.__size += len(data) - previous
+            if self.__size > self.max_size:
+                self.__evict()
+
+
+    def __evict(self):
+        """
+        Delete the least recently used entries until the cache is back under 'EVICT_TO' of 'max_size'.
+        """
+        entries = []
+        for path in self.__entry_paths():
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+        entries.sort()
+        self.__size = sum(size for _, size, _ in entries)
+
+        target = self.max_size * EVICT_TO
+        for _, size, path in entries:
+            if self.__size <= target:
+                break
+            try:
+                os.remove(path)
+                self.__size -= size
+            except OSError:
+                continue
+
+
+    def clear(self):
+        """
+        Delete every entry in the cache.
+        """
+        with self.__lock:
+            for path in self.__entry_paths():
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            self.__size = 0
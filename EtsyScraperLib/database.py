@@ -0,0 +1,317 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+from EtsyScraperLib.records import Listing, StoreSnapshot, url_listing_id
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS store_snapshots (
+    id INTEGER PRIMARY KEY,
+    store_name TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    description TEXT,
+    location TEXT,
+    logo TEXT,
+    banner TEXT,
+    product_quantity INTEGER,
+    sales_quantity INTEGER,
+    admirers INTEGER,
+    review_quantity INTEGER,
+    review_rating REAL,
+    page_fingerprints TEXT
+);
+CREATE INDEX IF NOT EXISTS store_snapshots_store ON store_snapshots (store_name, scraped_at);
+CREATE INDEX IF NOT EXISTS store_snapshots_time ON store_snapshots (scraped_at);
+
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT NOT NULL,
+    snapshot_id INTEGER REFERENCES store_snapshots(id),
+    store_name TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    position INTEGER,
+    title TEXT,
+    url TEXT,
+    price TEXT,
+    currency TEXT,
+    amount INTEGER
+);
+CREATE INDEX IF NOT EXISTS listings_listing ON listings (listing_id, scraped_at);
+CREATE INDEX IF NOT EXISTS listings_store ON listings (store_name, scraped_at);
+CREATE INDEX IF NOT EXISTS listings_time ON listings (scraped_at);
+
+CREATE TABLE IF NOT EXISTS products (
+    listing_id TEXT,
+    product_url TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    title TEXT,
+    price TEXT,
+    currency TEXT,
+    amount INTEGER,
+    description TEXT,
+    review_quantity INTEGER,
+    media TEXT
+);
+CREATE INDEX IF NOT EXISTS products_listing ON products (listing_id, scraped_at);
+CREATE INDEX IF NOT EXISTS products_time ON products (scraped_at);
+'''
+
+
+class ResultDatabase:
+    def __init__(self, path: str, batch_size: int = 1000):
+        """
+        A SQLite store of crawl results that keeps every observation, so price and store history can be queried.
+        The database runs in WAL mode so it can be read while a crawl is writing to it.
+        Args:
+            path: The database file, it is created if it doesn't exist. ':memory:' keeps it in memory.
+            batch_size: The number of products written per transaction by 'add_products()'
+        """
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.__lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL') # WAL stays consistent, only the last commits can be lost on power loss
+        self.connection.executescript(SCHEMA)
+        self.__migrate()
+
+
+    def __migrate(self):
+        """
+        Link the listings of a database written before listings referenced their snapshot, by store and crawl time.
+        """
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(listings)')]
+        with self.connection:
+            if 'snapshot_id' not in columns:
+                self.connection.execute('ALTER TABLE listings ADD COLUMN snapshot_id INTEGER REFERENCES store_snapshots(id)')
+                self.connection.execute(
+                    'UPDATE listings SET snapshot_id = (SELECT MAX(id) FROM store_snapshots AS snapshots '
+                    'WHERE snapshots.store_name = listings.store_name AND snapshots.scraped_at = listings.scraped_at)'
+                )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS listings_snapshot ON listings (snapshot_id, position)')
+
+
+    def add_store(self, store, scraped_at: Optional[float] = None, include_listings: bool = True) -> int:
+        """
+        Save a store's data and listings in one transaction.
+        Args:
+            store: A Store or StoreSnapshot.
+            scraped_at: When the store was crawled as a Unix timestamp, defaults to now.
+            include_listings: Whether to save the store's listings as well.
+        Returns:
+            Integer ID of the saved snapshot.
+        """
+        snapshot = store if isinstance(store, StoreSnapshot) else store.snapshot(include_listings)
+        scraped_at = time.time() if scraped_at is None else scraped_at
+
+        with self.__lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO store_snapshots (store_name, scraped_at, description, location, logo, banner, '
+                'product_quantity, sales_quantity, admirers, review_quantity, review_rating, page_fingerprints) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (snapshot.store_name, scraped_at, snapshot.store_description, snapshot.store_location,
+                 snapshot.store_logo, snapshot.store_banner, snapshot.product_quantity, snapshot.sales_quantity,
+                 snapshot.admirers, snapshot.review_quantity, snapshot.review_rating,
+                 json.dumps(list(snapshot.page_fingerprints)))
+            )
+            if include_listings:
+                self.__insert_listings(snapshot.store_name, snapshot.listings, scraped_at, cursor.lastrowid)
+            return cursor.lastrowid
+
+
+    def add_listings(self, store_name: str, listings: Iterable[Listing], scraped_at: Optional[float] = None,
+                     snapshot_id: Optional[int] = None):
+        """
+        Save listings on their own e.g. while streaming 'Store.iter_products()'
+        Args:
+            store_name: The name of the store the listings belong to.
+            listings: The listings to save.
+            scraped_at: When the listings were crawled as a Unix timestamp, defaults to now.
+            snapshot_id: The snapshot the listings belong to, as returned by 'add_store(include_listings=False)', so
+                'latest_snapshot()' returns them. Listings saved without one are only part of the price history.
+        """
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        with self.__lock, self.connection:
+            if snapshot_id is None:
+                start = 0
+            else:
+                start = self.connection.execute(
+                    'SELECT COUNT(*) FROM listings WHERE snapshot_id = ?', (snapshot_id,)
+                ).fetchone()[0] # listings streamed in several calls keep their order
+            self.__insert_listings(store_name, listings, scraped_at, snapshot_id, start)
+
+
+    def __insert_listings(self, store_name: str, listings: Iterable[Listing], scraped_at: float,
+                          snapshot_id: Optional[int], start: int = 0):
+        """
+        Insert listing rows, the caller holds the lock and the transaction.
+        """
+        self.connection.executemany(
+            'INSERT INTO listings (listing_id, snapshot_id, store_name, scraped_at, position, title, url, price, currency, '
+            'amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((listing.listing_id or listing.url, snapshot_id, store_name, scraped_at, i, listing.title, listing.url,
+              listing.price, listing.currency, listing.amount) for i, listing in enumerate(listings, start))
+        )
+
+
+    def add_product(self, product, scraped_at: Optional[float] = None):
+        """
+        Save a single product.
+        Args:
+            product: A Product or ProductResult, failed results are skipped.
+            scraped_at: When the product was crawled as a Unix timestamp, defaults to now.
+        """
+        self.add_products([product], scraped_at)
+
+
+    def add_products(self, products: Iterable, scraped_at: Optional[float] = None) -> int:
+        """
+        Save many products, 'batch_size' at a time per transaction e.g. straight from 'scrape_products()'
+        Args:
+            products: Products or ProductResults, failed results are skipped.
+            scraped_at: When the products were crawled as a Unix timestamp, defaults to the time each batch is written.
+        Returns:
+            Integer of the products saved.
+        """
+        saved = 0
+        batch = []
+        for item in products:
+            if hasattr(item, 'error') and hasattr(item, 'product'): # ProductResult
+                if item.error is not None:
+                    continue
+                item = item.product
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                saved += self.__insert_products(batch, scraped_at)
+                batch = []
+
+        if batch:
+            saved += self.__insert_products(batch, scraped_at)
+        return saved
+
+
+    def __insert_products(self, products: List, scraped_at: Optional[float]) -> int:
+        """
+        Insert a batch of products in one transaction.
+        Returns:
+            Integer of the products inserted.
+        """
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        with self.__lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO products (listing_id, product_url, scraped_at, title, price, currency, amount, description, '
+                'review_quantity, media) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((url_listing_id(product.product_url), product.product_url, scraped_at, product.title, product.price,
+                  product.currency, product.amount, product.description, product.review_quantity,
+                  json.dumps(product.media_urls)) for product in products)
+            )
+        return len(products)
+
+
+    def price_history(self, listing_id: str) -> List[Tuple[float, str]]:
+        """
+        Get every price seen for a listing, from both store listing pages and product pages.
+        Args:
+            listing_id: The Etsy listing ID e.g. 1573434449
+        Returns:
+            List of (scraped at, price) in time order.
+        """
+        with self.__lock:
+            return self.connection.execute(
+                'SELECT scraped_at, price FROM listings WHERE listing_id = ? '
+                'UNION ALL SELECT scraped_at, price FROM products WHERE listing_id = ? '
+                'ORDER BY scraped_at',
+                (str(listing_id), str(listing_id))
+            ).fetchall()
+
+
+    def price_changes(self, listing_id: str) -> List[Tuple[float, str]]:
+        """
+        Get only the points where a listing's price changed.
+        Args:
+            listing_id: The Etsy listing ID.
+        Returns:
+            List of (scraped at, new price) in time order, starting with the first price seen.
+        """
+        changes = []
+        for scraped_at, price in self.price_history(listing_id):
+            if not changes or changes[-1][1] != price:
+                changes.append((scraped_at, price))
+        return changes
+
+
+    def quantity_changes(self, since: Optional[float] = None) -> List[Tuple[str, float, int, int]]:
+        """
+        Find stores whose product quantity changed between one crawl and the next.
+        Args:
+            since: Only include changes found by crawls at or after this Unix timestamp.
+        Returns:
+            List of (store name, scraped at, previous quantity, new quantity) in time order.
+        """
+        with self.__lock:
+            return self.connection.execute(
+                'SELECT store_name, scraped_at, previous, product_quantity FROM ('
+                '    SELECT store_name, scraped_at, product_quantity,'
+                '        LAG(product_quantity) OVER (PARTITION BY store_name ORDER BY scraped_at) AS previous'
+                '    FROM store_snapshots'
+                ') WHERE previous IS NOT NULL AND previous != product_quantity AND scraped_at >= ? '
+                'ORDER BY scraped_at',
+                (since if since is not None else float('-inf'),)
+            ).fetchall()
+
+
+    def latest_snapshot(self, store_name: str) -> Optional[StoreSnapshot]:
+        """
+        Rebuild the most recent snapshot of a store, e.g. to pass to 'Store.incremental_update()'
+        Args:
+            store_name: The name of the store.
+        Returns:
+            StoreSnapshot with its listings, None if the store has never been saved.
+        """
+        with self.__lock:
+            row = self.connection.execute(
+                'SELECT id, description, location, logo, banner, product_quantity, sales_quantity, admirers, '
+                'review_quantity, review_rating, page_fingerprints FROM store_snapshots WHERE store_name = ? '
+                'ORDER BY scraped_at DESC, id DESC LIMIT 1',
+                (store_name,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            listings = [
+                Listing(title, url, price, currency, amount) for title, url, price, currency, amount in self.connection.execute(
+                    'SELECT title, url, price, currency, amount FROM listings WHERE snapshot_id = ? ORDER BY position',
+                    (row[0],)
+                )
+            ]
+
+        return StoreSnapshot(
+            store_name,
+            store_description=row[1],
+            store_location=row[2],
+            store_logo=row[3],
+            store_banner=row[4],
+            product_quantity=row[5],
+            sales_quantity=row[6],
+            admirers=row[7],
+            review_quantity=row[8],
+            review_rating=row[9],
+            listings=listings,
+            page_fingerprints=json.loads(row[10]) if row[10] else []
+        )
+
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.connection.close()
+
+
+    def __enter__(self) -> 'ResultDatabase':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,213 @@
+import io
+import csv
+import gzip
+import json
+from typing import IO, Iterable, List, Optional, Union
+from EtsyScraperLib.records import Listing, StoreSnapshot
+from EtsyScraperLib.lazy import is_loaded
+
+
+def to_record(item) -> dict:
+    """
+    Convert anything the library produces into a flat dictionary for export.
+    Store data is exported without its listings, those are written as records of their own.
+    Args:
+        item: A Listing, StoreSnapshot, Store, CrawlResult, StoreDiff, Product, ProductResult or dictionary.
+    Returns:
+        Dictionary of the item's data.
+    Raises:
+        TypeError: If the item isn't one of those types.
+    """
+    if isinstance(item, dict):
+        return item
+    if isinstance(item, Listing):
+        return item.to_dict()
+    if callable(getattr(item, 'snapshot', None)): # Store
+        item = item.snapshot(include_listings=False)
+    elif hasattr(item, 'snapshot') and hasattr(item, 'store_name') and hasattr(item, 'error'): # CrawlResult
+        if item.error is not None:
+            return {'storeName': item.store_name, 'error': str(item.error)}
+        item = item.snapshot
+    elif hasattr(item, 'snapshot') and hasattr(item, 'changed'): # StoreDiff, the new snapshot is exported
+        item = item.snapshot
+    if isinstance(item, StoreSnapshot):
+        return item.to_dict(include_listings=False)
+    if hasattr(item, 'error') and hasattr(item, 'product'): # ProductResult
+        if item.error is not None:
+            return {'productURL': item.url, 'error': str(item.error)}
+        item = item.product
+    if hasattr(item, 'to_dict'): # Product
+        record = item.to_dict()
+        record['productURL'] = item.product_url
+        return record
+    raise TypeError(f'Can\'t export {type(item).__name__}, expected a Listing, StoreSnapshot, Store, CrawlResult, '
+                    'StoreDiff, Product, ProductResult or dictionary')
+
+
+class RecordWriter:
+    def __init__(self, target: Union[str, IO], compress: Optional[bool] = None):
+        """
+        Base class for writers that stream records to a file one at a time.
+        Args:
+            target: A file path or an open file-like object (text or binary).
+            compress: Whether to gzip the output, defaults to True for paths ending in '.gz'
+        """
+        self.__owned = []
+
+        if isinstance(target, str):
+            if compress is None:
+                compress = target.endswith('.gz')
+            raw = open(target, 'wb')
+            self.__owned.append(raw)
+        else:
+            raw = target
+            compress = bool(compress)
+
+        if compress:
+            if isinstance(raw, io.TextIOBase):
+                raise ValueError('Compressed output needs a binary file object.')
+            raw = gzip.GzipFile(fileobj=raw, mode='wb')
+            self.__owned.append(raw) # closing a GzipFile doesn't close the file it wraps
+
+        if isinstance(raw, io.TextIOBase):
+            self.stream = raw
+            self.__wrapper = None
+        else:
+            self.stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            self.__wrapper = self.stream
+
+        self.count = 0
+
+
+    def write(self, item):
+        """
+        Write a single record.
+        Args:
+            item: A Listing, StoreSnapshot, Store, CrawlResult, StoreDiff, Product, ProductResult or dictionary.
+        """
+        self._write_record(to_record(item))
+        self.count += 1
+
+
+    def write_many(self, items: Iterable):
+        """
+        Write records one at a time as they're produced, e.g. from 'Store.iter_products()' or 'scrape_products()'
+        Args:
+            items: An iterable of anything accepted by 'write()'
+        """
+        for item in items:
+            self.write(item)
+
+
+    def write_store(self, store, include_store: bool = True):
+        """
+        Write a store's listings, each tagged with the store name, streaming them if they haven't been collected yet.
+        Args:
+            store: A Store or StoreSnapshot.
+            include_store: Whether to write the store's own record first.
+        """
+        if include_store:
+            self.write(store)
+
+        if hasattr(store, 'iter_products') and not is_loaded(store, 'listings'): # collected listings are written even if empty
+            listings = store.iter_products()
+        else:
+            listings = store.listings
+
+        for listing in listings:
+            record = listing.to_dict()
+            record['storeName'] = store.store_name
+            self._write_record(record)
+            self.count += 1
+
+
+    def _write_record(self, record: dict):
+        raise NotImplementedError
+
+
+    def close(self):
+        """
+        Flush everything and close the files this writer opened, a file object passed in is left open.
+        """
+        self.stream.flush()
+        if self.__wrapper is not None:
+            self.__wrapper.detach()
+        for file in reversed(self.__owned):
+            file.close()
+        self.__owned = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NDJSONWriter(RecordWriter):
+    """
+    Writes one compact JSON object per line.
+    """
+
+    def _write_record(self, record: dict):
+        self.stream.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+        self.stream.write('\n')
+
+
+class CSVWriter(RecordWriter):
+    def __init__(self, target: Union[str, IO], compress: Optional[bool] = None, fieldnames: Optional[List[str]] = None):
+        """
+        Writes records as CSV rows, the columns are taken from the first record unless given.
+        Lists are joined with spaces and nested values are written as JSON.
+        Args:
+            target: A file path or an open file-like object (text or binary).
+            compress: Whether to gzip the output, defaults to True for paths ending in '.gz'
+            fieldnames: The columns to write.
+        """
+        super().__init__(target, compress)
+        self.fieldnames = fieldnames
+        self.__writer = None
+
+
+    def write_store(self, store, include_store: bool = False):
+        """
+        Write a store's listings as rows tagged with the store name, the store's own record doesn't fit the columns.
+        Args:
+            store: A Store or StoreSnapshot.
+            include_store: Ignored for CSV.
+        """
+        super().write_store(store, include_store=False)
+
+
+    def _write_record(self, record: dict):
+        if self.__writer is None:
+            self.fieldnames = self.fieldnames or list(record.keys())
+            self.__writer = csv.DictWriter(self.stream, fieldnames=self.fieldnames, extrasaction='ignore')
+            self.__writer.writeheader()
+
+        row = {}
+        for key, value in record.items():
+            if isinstance(value, list):
+                value = ' '.join(str(v) for v in value)
+            elif isinstance(value, dict):
+                value = json.dumps(value, separators=(',', ':'))
+            row[key] = value
+        self.__writer.writerow(row)
+
+
+def open_writer(target: Union[str, IO], format: str = 'ndjson', compress: Optional[bool] = None) -> RecordWriter:
+    """
+    Open a record writer for the given format.
+    Args:
+        target: A file path or an open file-like object.
+        format: Either 'ndjson' or 'csv'
+        compress: Whether to gzip the output, defaults to True for paths ending in '.gz'
+    Returns:
+        The writer, use it as a context manager so it gets closed.
+    """
+    if format == 'ndjson':
+        return NDJSONWriter(target, compress)
+    if format == 'csv':
+        return CSVWriter(target, compress)
+    raise ValueError(f'Unknown export format: {format}')
@@ -0,0 +1,164 @@
+from bs4 import BeautifulSoup, Tag
+from typing import Dict, List, Optional
+from EtsyScraperLib.records import Listing, canonical_listing_url
+
+
+DESCRIPTION_CLASS = 'wt-text-caption wt-hide-xs wt-show-lg wt-wrap wt-break-all'
+BANNER_CLASS = 'wt-position-absolute wt-display-block fill-min-height wt-width-full'
+SALES_CLASS = 'wt-text-caption wt-no-wrap'
+
+
+def has_class(tag: Tag, class_name: str) -> bool:
+    """
+    Match a tag's class the same way BeautifulSoup4 does for "{'class': class_name}".
+    Args:
+        tag: The tag to check.
+        class_name: A single class e.g. 'shop-location' or an exact class string e.g. 'wt-text-caption wt-no-wrap'
+    Returns:
+        True if the tag has the class.
+    """
+    classes = tag.get('class')
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = classes.split()
+    if ' ' in class_name:
+        return ' '.join(classes) == class_name
+    return class_name in classes
+
+
+def within(tag: Tag, container: Optional[Tag]) -> bool:
+    """
+    Check whether a tag sits somewhere inside a container.
+    Args:
+        tag: The tag to check.
+        container: The possible ancestor, None is never matched.
+    Returns:
+        True if the container is an ancestor of the tag.
+    """
+    if container is None:
+        return False
+    for parent in tag.parents:
+        if parent is container:
+            return True
+    return False
+
+
+def extract_store_fields(soup: BeautifulSoup) -> Dict[str, object]:
+    """
+    Walk the store page once and pick out the element behind every store field.
+    Each field matches the first element the equivalent chain of 'find()' calls would have returned.
+    Args:
+        soup: The parsed store page.
+    Returns:
+        Dictionary of field name to element (None if not found), 'page_buttons' and 'review_blocks' hold lists.
+    """
+    fields = {
+        'description': None,
+        'location': None,
+        'logo': None,
+        'banner': None,
+        'sales': None,
+        'product_quantity': None,
+        'admirers': None,
+        'rating': None,
+        'page_buttons': None,
+        'review_blocks': None
+    }
+
+    # containers the nested fields are looked up in
+    sales_reviews = None
+    side_bar = None
+    tab_container = None
+    tab_item = None
+    shop_box = None
+    pagination = None
+    stars = None
+    reviews_total = None
+
+    if soup is None:
+        return fields
+
+    for tag in soup.descendants:
+        if not isinstance(tag, Tag):
+            continue
+
+        name = tag.name
+        if name == 'div':
+            if sales_reviews is None and has_class(tag, 'shop-sales-reviews'):
+                sales_reviews = tag
+            elif side_bar is None and has_class(tag, 'shop-home-wider-sections'):
+                side_bar = tag
+            elif tab_container is None and has_class(tag, 'wt-tab-container') and within(tag, side_bar):
+                tab_container = tag
+            elif shop_box is None and has_class(tag, 'shop-home-wider-items'):
+                shop_box = tag
+            elif pagination is None and has_class(tag, 'wt-show-xl') and within(tag, shop_box):
+                pagination = tag
+                fields['page_buttons'] = []
+            elif reviews_total is None and has_class(tag, 'reviews-total'):
+                reviews_total = tag
+                fields['review_blocks'] = []
+            elif has_class(tag, 'wt-display-inline-block') and within(tag, reviews_total):
+                fields['review_blocks'].append(tag)
+
+        elif name == 'span':
+            if fields['location'] is None and has_class(tag, 'shop-location'):
+                fields['location'] = tag
+            elif fields['sales'] is None and has_class(tag, SALES_CLASS) and within(tag, sales_reviews):
+                fields['sales'] = tag
+            elif fields['product_quantity'] is None and has_class(tag, 'wt-mr-md-2') and within(tag, tab_item):
+                fields['product_quantity'] = tag
+            elif stars is None and has_class(tag, 'stars-svg'):
+                stars = tag
+
+        elif name == 'img':
+            if fields['logo'] is None and has_class(tag, 'shop-icon-external'):
+                fields['logo'] = tag
+            elif fields['banner'] is None and has_class(tag, BANNER_CLASS):
+                fields['banner'] = tag
+
+        elif name == 'p':
+            if fields['description'] is None and has_class(tag, DESCRIPTION_CLASS):
+                fields['description'] = tag
+
+        elif name == 'li':
+            if tab_item is None and has_class(tag, 'wt-tab__item') and within(tag, tab_container):
+                tab_item = tag
+            elif has_class(tag, 'wt-action-group__item-container') and within(tag, pagination):
+                fields['page_buttons'].append(tag)
+
+        elif name == 'a':
+            if fields['admirers'] is None and 'favoriters' in tag.get('href', '') and within(tag, side_bar):
+                fields['admirers'] = tag
+
+        elif name == 'input':
+            if fields['rating'] is None and tag.get('name') == 'rating' and within(tag, stars):
+                fields['rating'] = tag
+
+    return fields
+
+
+def extract_listing_page(page_soup: BeautifulSoup) -> List[Listing]:
+    """
+    Pick out the products from a parsed listing page.
+    Args:
+        page_soup: The parsed listing page.
+    Returns:
+        List of the listings found on the page.
+    """
+    listings = page_soup.find('div', {'class': 'responsive-listing-grid'})
+    listing_links = listings.find_all('a', {'class': 'listing-link'})
+    urls = [canonical_listing_url(product['href']) for product in listing_links]
+
+    listing_titles = listings.find_all('div', {'class': 'v2-listing-card__info'})
+    titles = [title.find('h3').text.strip() for title in listing_titles]
+
+    listing_prices = listings.find_all('div', {'class': 'n-listing-card__price'})
+    prices = [
+        symbol.text + price.text for price, symbol in ((product.find('span', {'class': 'currency-value'}), 
+                                                        product.find('span', {'class': 'currency-symbol'})) 
+                                                        for product in listing_prices)
+        ]
+
+    return [Listing(title, url, price) for title, url, price in zip(titles, urls, prices)]
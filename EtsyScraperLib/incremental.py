@@ -0,0 +1,133 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+from EtsyScraperLib.records import Listing, StoreSnapshot, url_listing_id
+
+
+def listing_key(listing: Listing) -> str:
+    """
+    Get the key a listing is matched on between crawls.
+    Args:
+        listing: The listing.
+    Returns:
+        String of the listing ID, or the URL if it doesn't contain one.
+    """
+    return url_listing_id(listing.url)
+
+
+def page_fingerprint(listings: Iterable[Listing]) -> str:
+    """
+    Hash the listing IDs of a listing page in order.
+    Args:
+        listings: The listings on the page.
+    Returns:
+        String of the hex digest.
+    """
+    digest = hashlib.sha1()
+    for listing in listings:
+        digest.update(listing_key(listing).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class StoreDiff:
+    __slots__ = ('added', 'removed', 'changed', 'pages_fetched', 'snapshot')
+
+    def __init__(self, added: List[Listing], removed: List[Listing], changed: List[Tuple[Listing, Listing]],
+                 pages_fetched: int, snapshot: StoreSnapshot):
+        """
+        The listings that differ between two crawls of a store.
+        Args:
+            added: Listings that weren't in the previous snapshot.
+            removed: Listings that are no longer in the store.
+            changed: (previous, current) pairs of listings whose title or price changed. Only listings on the pages that
+                were fetched are compared, the tail reused from the previous snapshot is assumed unchanged.
+            pages_fetched: The number of listing pages downloaded to build the diff.
+            snapshot: The new snapshot of the store.
+        """
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.pages_fetched = pages_fetched
+        self.snapshot = snapshot
+
+
+    @property
+    def unchanged(self) -> bool:
+        """
+        Whether the store's listings are the same as last time.
+        """
+        return not (self.added or self.removed or self.changed)
+
+
+def diff_listings(previous: Iterable[Listing], current: Iterable[Listing]) -> Tuple[List[Listing], List[Listing], List[Tuple[Listing, Listing]]]:
+    """
+    Compare two sets of listings by listing ID.
+    Args:
+        previous: The listings from the last crawl.
+        current: The listings from this crawl.
+    Returns:
+        Tuple of the added listings, removed listings and (previous, current) pairs that changed.
+    """
+    previous_by_key = {listing_key(listing): listing for listing in previous}
+    current_by_key = {}
+    added = []
+    changed = []
+
+    for listing in current:
+        key = listing_key(listing)
+        current_by_key[key] = listing
+        old = previous_by_key.get(key)
+        if old is None:
+            added.append(listing)
+        elif old.title != listing.title or old.price != listing.price:
+            changed.append((old, listing))
+
+    removed = [listing for key, listing in previous_by_key.items() if key not in current_by_key]
+    return added, removed, changed
+
+
+def find_reusable_tail(page: List[Listing], page_number: int, collected: int, previous: StoreSnapshot,
+                       previous_keys: List[str], positions: Dict[str, int], product_quantity: int) -> Optional[int]:
+    """
+    Check whether the rest of the store can be taken from the previous snapshot after this page.
+    Etsy lists newest first, so once a page lines up with a run of the previous listings, everything after that run
+    is assumed unchanged as long as the totals agree with the store's product quantity.
+    Args:
+        page: The listings on the page just fetched.
+        page_number: The page number, starting at 1.
+        collected: The number of listings collected including this page.
+        previous: The previous snapshot, its page fingerprints let an identical page skip the key comparison.
+        previous_keys: The listing keys of the previous snapshot in order.
+        positions: The index of each key in 'previous_keys'.
+        product_quantity: The store's current product quantity.
+    Returns:
+        Index into the previous listings where the reusable tail starts, None if more pages need fetching.
+    """
+    if not page or product_quantity < 1:
+        return None
+
+    start = positions.get(listing_key(page[0]))
+    if start is None:
+        return None
+
+    same_page = page_number <= len(previous.page_fingerprints) and previous.page_fingerprints[page_number - 1] == page_fingerprint(page)
+    if not same_page and previous_keys[start:start + len(page)] != [listing_key(listing) for listing in page]:
+        return None # the page doesn't line up with the previous crawl
+
+    end = start + len(page)
+    if collected + len(previous_keys) - end != product_quantity:
+        return None
+    return end
+
+
+def chunk_fingerprints(listings: List[Listing], page_size: int) -> List[str]:
+    """
+    Fingerprint listings that weren't fetched page by page, assuming every page holds 'page_size' listings.
+    Args:
+        listings: The listings in store order.
+        page_size: The number of listings per page.
+    Returns:
+        List of page fingerprints.
+    """
+    page_size = max(1, page_size)
+    return [page_fingerprint(listings[i:i + page_size]) for i in range(0, len(listings), page_size)]
@@ -0,0 +1,138 @@
+import os
+import threading
+from typing import Iterable, Optional, Set, Union
+from EtsyScraperLib.records import url_listing_id
+
+
+class ListingIndex:
+    def __init__(self, path: Optional[str] = None):
+        """
+        A thread-safe set of the listings a crawl has scraped, keyed by Etsy listing ID so tracking query strings and
+        different slugs of the same listing count as one. Workers claim a listing before requesting it, so a listing
+        found on two pages or by two workers is only fetched once.
+        Args:
+            path: An optional file scraped listings are appended to, one ID per line, so later runs skip them too.
+                It is created if it doesn't exist. Defaults to keeping the index in memory.
+        """
+        self.path = path
+        self.__done: Set[Union[int, str]] = set()
+        self.__claimed: Set[Union[int, str]] = set()
+        self.__lock = threading.Lock()
+        self.__file = None
+
+        if path is not None:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as file:
+                    for line in file:
+                        line = line.strip()
+                        if line:
+                            self.__done.add(self.__key(line))
+            self.__file = open(path, 'a', encoding='utf-8')
+
+
+    @staticmethod
+    def __key(url: str) -> Union[int, str]:
+        """
+        Get the key a listing is stored under, IDs are kept as integers as they take less memory than strings.
+        Args:
+            url: A product URL or listing ID.
+        Returns:
+            Integer of the listing ID, or the URL if it doesn't contain one.
+        """
+        key = url_listing_id(str(url))
+        return int(key) if key.isdigit() else key
+
+
+    def __contains__(self, url: str) -> bool:
+        key = self.__key(url)
+        with self.__lock:
+            return key in self.__done or key in self.__claimed
+
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__done | self.__claimed)
+
+
+    def claim(self, url: str) -> bool:
+        """
+        Reserve a listing before fetching it.
+        Args:
+            url: A product URL or listing ID.
+        Returns:
+            True if the listing should be fetched, False if it has already been scraped or claimed by another worker.
+        """
+        key = self.__key(url)
+        with self.__lock:
+            if key in self.__done or key in self.__claimed:
+                return False
+            self.__claimed.add(key)
+            return True
+
+
+    def complete(self, url: str):
+        """
+        Record that a claimed listing has been scraped, it's written to the index file straight away.
+        Args:
+            url: A product URL or listing ID.
+        """
+        key = self.__key(url)
+        with self.__lock:
+            self.__claimed.discard(key)
+            if key in self.__done:
+                return
+            self.__done.add(key)
+            if self.__file is not None:
+                self.__file.write(f'{key}\n')
+                self.__file.flush()
+
+
+    def release(self, url: str):
+        """
+        Give up a claim on a listing that couldn't be scraped, so it can be fetched again.
+        Args:
+            url: A product URL or listing ID.
+        """
+        key = self.__key(url)
+        with self.__lock:
+            self.__claimed.discard(key)
+
+
+    def add(self, url: str) -> bool:
+        """
+        Record a listing as scraped in one step.
+        Args:
+            url: A product URL or listing ID.
+        Returns:
+            True if the listing wasn't in the index already.
+        """
+        if not self.claim(url):
+            return False
+        self.complete(url)
+        return True
+
+
+    def update(self, urls: Iterable[str]):
+        """
+        Record many listings as scraped e.g. the URLs already saved by an earlier crawl.
+        Args:
+            urls: Product URLs or listing IDs.
+        """
+        for url in urls:
+            self.add(url)
+
+
+    def close(self):
+        """
+        Close the index file.
+        """
+        if self.__file is not None:
+            self.__file.close()
+
+
+    def __enter__(self) -> 'ListingIndex':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
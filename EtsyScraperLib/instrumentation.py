@@ -0,0 +1,164 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+logger = logging.getLogger('EtsyScraperLib')
+logger.addHandler(logging.NullHandler())
+
+Hook = Callable[[str, dict], None]
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Thread-safe counters and per-stage timings collected while scraping.
+        """
+        self.__lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.timings: Dict[str, List[float]] = {} # stage: [count, total seconds, max seconds]
+
+
+    def increment(self, name: str, value: int = 1):
+        """
+        Add to a counter.
+        Args:
+            name: The counter e.g. 'bytes_fetched', 'cache_hits'
+            value: The amount to add.
+        """
+        with self.__lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Record how long a stage took.
+        Args:
+            stage: The stage e.g. 'connect', 'download', 'parse', 'extract'
+            seconds: The time taken.
+        """
+        with self.__lock:
+            timing = self.timings.get(stage)
+            if timing is None:
+                self.timings[stage] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+
+
+    def snapshot(self) -> dict:
+        """
+        Get a copy of everything collected so far.
+        Returns:
+            Dictionary of 'counters' and 'timings', each timing holds its count, total, mean and max seconds.
+        """
+        with self.__lock:
+            return {
+                'counters': dict(self.counters),
+                'timings': {
+                    stage: {'count': count, 'total': total, 'mean': total / count, 'max': longest}
+                    for stage, (count, total, longest) in self.timings.items()
+                }
+            }
+
+
+    def reset(self):
+        """
+        Clear every counter and timing.
+        """
+        with self.__lock:
+            self.counters.clear()
+            self.timings.clear()
+
+
+metrics = Metrics()
+_hooks: List[Hook] = []
+
+
+def add_hook(hook: Hook):
+    """
+    Register a function that's called with every instrumentation event, e.g. to forward them to StatsD or Prometheus.
+    Args:
+        hook: Called as hook(event, data) where event is 'timing', 'counter' or 'selector_failure'
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook):
+    """
+    Unregister a hook added with 'add_hook()'
+    Args:
+        hook: The function to remove.
+    """
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _emit(event: str, data: dict):
+    """
+    Pass an event to every hook, a failing hook is logged rather than interrupting the scrape.
+    """
+    for hook in list(_hooks):
+        try:
+            hook(event, data)
+        except Exception:
+            logger.exception('Instrumentation hook %r failed', hook)
+
+
+def observe(stage: str, seconds: float, **data):
+    """
+    Record a stage timing and pass it to the hooks.
+    Args:
+        stage: The stage e.g. 'connect', 'download', 'parse', 'extract'
+        seconds: The time taken.
+        data: Extra details for the hooks e.g. url
+    """
+    metrics.observe(stage, seconds)
+    if _hooks:
+        _emit('timing', dict(data, stage=stage, seconds=seconds))
+
+
+def increment(name: str, value: int = 1, **data):
+    """
+    Add to a counter and pass it to the hooks.
+    Args:
+        name: The counter e.g. 'bytes_fetched', 'cache_hits'
+        value: The amount to add.
+        data: Extra details for the hooks e.g. url
+    """
+    metrics.increment(name, value)
+    if _hooks:
+        _emit('counter', dict(data, name=name, value=value))
+
+
+def selector_failed(selector: str, message: str, level: int = logging.WARNING):
+    """
+    Record that a field couldn't be found or read on a page, usually because Etsy changed its markup.
+    Args:
+        selector: The field that failed e.g. 'store.sales_quantity', 'product.price'
+        message: The message to log.
+        level: The logging level of the message.
+    """
+    logger.log(level, message)
+    metrics.increment('selector_failures')
+    metrics.increment(f'selector_failures.{selector}')
+    if _hooks:
+        _emit('selector_failure', {'selector': selector, 'message': message})
+
+
+@contextmanager
+def timed(stage: str, **data):
+    """
+    Time the enclosed block as a stage.
+    Args:
+        stage: The stage e.g. 'parse', 'extract'
+        data: Extra details for the hooks e.g. url
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, **data)
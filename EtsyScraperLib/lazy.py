@@ -0,0 +1,70 @@
+import functools
+from typing import Any, Callable, Optional
+
+
+class LazyField:
+    def __init__(self, loader: str, default: Any = None, factory: Optional[Callable[[], Any]] = None):
+        """
+        A field that's only extracted the first time it's read, fetching the page it comes from if that hasn't happened.
+        The loader stores the value on the instance, so every later read is a plain attribute lookup.
+        The owning class provides 'ensure_loaded(field)', which fetches whatever the field needs.
+        Args:
+            loader: The method that extracts the field and stores it on the instance e.g. 'get_title'
+            default: The value the field has while it's being extracted, and keeps if extraction fails.
+            factory: Called to make the default instead, for mutable defaults such as lists.
+        """
+        self.loader = loader
+        self.default = default
+        self.factory = factory
+        self.name = loader
+
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+
+    def initial(self) -> Any:
+        """
+        Get a fresh default value.
+        """
+        return self.factory() if self.factory is not None else self.default
+
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance.__dict__[self.name] = self.initial() # a failing loader reads the field back
+        instance.ensure_loaded(self.name)
+        getattr(instance, self.loader)()
+        return instance.__dict__[self.name]
+
+
+def fills(*fields: str):
+    """
+    Mark a method as extracting lazy fields, so reading them inside it gives their default rather than loading them again.
+    Args:
+        fields: The names of the fields the method stores.
+    Returns:
+        The decorator.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            for name in fields:
+                if name not in self.__dict__:
+                    self.__dict__[name] = getattr(type(self), name).initial()
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_loaded(instance, name: str) -> bool:
+    """
+    Check whether a lazy field has been extracted or set, without extracting it.
+    Args:
+        instance: The Store or Product.
+        name: The field name.
+    Returns:
+        True if reading the field won't fetch or extract anything.
+    """
+    return name in getattr(instance, '__dict__', {}) or not isinstance(getattr(type(instance), name, None), LazyField)
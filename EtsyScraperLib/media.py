@@ -0,0 +1,300 @@
+import os
+import json
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+from EtsyScraperLib.transport import Transport, get_default_transport
+from EtsyScraperLib.instrumentation import increment, logger
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+INDEX_NAME = 'index.jsonl'
+CONTENT_RANGE_START = 'bytes '
+
+
+class MediaResult:
+    __slots__ = ('url', 'path', 'sha256', 'size', 'downloaded', 'error')
+
+    def __init__(self, url: str, path: Optional[str] = None, sha256: Optional[str] = None, size: int = 0,
+                 downloaded: bool = False, error: Optional[Exception] = None):
+        """
+        The outcome of fetching one media URL.
+        Args:
+            url: The media URL.
+            path: Where the content is stored, None if it failed.
+            sha256: The hex digest of the content.
+            size: The size of the content in bytes.
+            downloaded: False if the URL or its content was already in the store.
+            error: The exception raised while downloading, None if it succeeded.
+        """
+        self.url = url
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.downloaded = downloaded
+        self.error = error
+
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the media is in the store.
+        """
+        return self.error is None
+
+
+class MediaStore:
+    def __init__(self, directory: str, transport: Optional[Transport] = None, max_workers: int = 8,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        A content-addressed folder of product images and videos, each file is named after the SHA-256 of its content.
+        URLs already fetched are never requested again, and different URLs with the same content are stored once.
+        Args:
+            directory: The folder media is stored in, it is created if it doesn't exist.
+            transport: The pooled HTTP transport to download with, defaults to the process-wide transport.
+            max_workers: The number of files downloaded at once. Keep this at or below the transport's pool size.
+            chunk_size: Bytes read from the connection and written to disk at a time.
+        """
+        self.directory = directory
+        self.transport = transport or get_default_transport()
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.__lock = threading.Lock()
+        self.__urls: Dict[str, dict] = {}
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'partial'), exist_ok=True)
+
+        index_path = os.path.join(directory, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        self.__urls[entry['url']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue # a line cut short by the process being killed
+
+        self.__index = open(index_path, 'a', encoding='utf-8')
+
+
+    def object_path(self, sha256: str, extension: str = '') -> str:
+        """
+        Get where content with a given hash is stored.
+        Args:
+            sha256: The hex digest of the content.
+            extension: The file extension e.g. '.jpg'
+        Returns:
+            String of the file path.
+        """
+        return os.path.join(self.directory, 'objects', sha256[:2], sha256 + extension)
+
+
+    def __partial_path(self, url: str) -> str:
+        """
+        Get where a URL's download is kept while it's in progress.
+        Args:
+            url: The media URL.
+        Returns:
+            String of the file path.
+        """
+        return os.path.join(self.directory, 'partial', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+
+
+    def lookup(self, url: str) -> Optional[MediaResult]:
+        """
+        Find a URL that has already been stored.
+        Args:
+            url: The media URL.
+        Returns:
+            MediaResult of the stored file, None if the URL hasn't been stored or its file has gone.
+        """
+        entry = self.__urls.get(url)
+        if entry is None:
+            return None
+        path = self.object_path(entry['sha256'], entry.get('extension', ''))
+        if not os.path.exists(path):
+            return None
+        return MediaResult(url, path=path, sha256=entry['sha256'], size=entry['size'])
+
+
+    def fetch(self, url: str) -> MediaResult:
+        """
+        Download a single URL into the store, carrying on from where an earlier attempt stopped if possible.
+        Args:
+            url: The media URL.
+        Returns:
+            MediaResult of the stored file, errors are returned rather than raised.
+        """
+        stored = self.lookup(url)
+        if stored is not None:
+            increment('media_skipped', url=url)
+            return stored
+
+        try:
+            return self.__download(url)
+        except (requests.exceptions.RequestException, OSError) as e:
+            logger.error('Couldn\'t download %s: %s', url, e)
+            increment('media_failures', url=url)
+            return MediaResult(url, error=e)
+
+
+    def __download(self, url: str) -> MediaResult:
+        """
+        Stream a URL to its partial file in chunks, then move it into the store under its content hash.
+        """
+        partial = self.__partial_path(url)
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+
+        response = self.transport.get(url, stream=True, headers=headers)
+        if response.status_code == 206 and not (offset and self.__continues(response, offset)):
+            # a range other than the one asked for can't be appended, so the partial file is dropped and the whole file fetched
+            response.close()
+            logger.warning('%s answered with a range not starting at byte %d, downloading it again', url, offset)
+            increment('media_range_mismatches', url=url)
+            if offset:
+                os.remove(partial)
+            offset = 0
+            response = self.transport.get(url, stream=True)
+
+        try:
+            if response.status_code == 416 and offset: # the partial file already holds everything
+                response.close()
+                return self.__store(url, partial)
+            response.raise_for_status()
+
+            resumed = bool(offset) and response.status_code == 206
+            if not resumed and response.status_code != 200:
+                raise requests.exceptions.HTTPError(f'Expected the whole of {url}, got a {response.status_code} response',
+                                                    response=response)
+            with open(partial, 'ab' if resumed else 'wb') as file: # a full response replaces the partial file
+                for chunk in response.iter_content(self.chunk_size):
+                    file.write(chunk)
+                    increment('media_bytes', len(chunk))
+        finally:
+            response.close()
+
+        if resumed:
+            increment('media_resumed', url=url)
+        return self.__store(url, partial)
+
+
+    @staticmethod
+    def __continues(response: requests.Response, offset: int) -> bool:
+        """
+        Check whether a partial response picks up exactly where the partial file ends.
+        Args:
+            response: The 206 response.
+            offset: The size of the partial file.
+        Returns:
+            True if its 'Content-Range' starts at the offset.
+        """
+        return response.headers.get('Content-Range', '').startswith(f'{CONTENT_RANGE_START}{offset}-')
+
+
+    def __store(self, url: str, partial: str) -> MediaResult:
+        """
+        Hash a finished download and move it to its content-addressed path, dropping it if the content is already stored.
+        Args:
+            url: The media URL.
+            partial: The finished partial file.
+        Returns:
+            MediaResult of the stored file.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial, 'rb') as file:
+            for chunk in iter(lambda: file.read(self.chunk_size), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        path = self.object_path(sha256, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if os.path.exists(path):
+            os.remove(partial)
+            increment('media_deduplicated', url=url)
+        else:
+            os.replace(partial, path)
+
+        entry = {'url': url, 'sha256': sha256, 'size': size, 'extension': extension}
+        with self.__lock:
+            self.__urls[url] = entry
+            self.__index.write(json.dumps(entry) + '\n')
+            self.__index.flush()
+
+        return MediaResult(url, path=path, sha256=sha256, size=size, downloaded=True)
+
+
+    def download(self, urls: Iterable[str]) -> Iterator[MediaResult]:
+        """
+        Download many URLs across a pool of workers, yielding each result as soon as it completes.
+        Each URL is fetched at most once, however many times it's given.
+        Args:
+            urls: The media URLs e.g. the output of 'Product.parse_media()'
+        Yields:
+            MediaResult for every distinct URL in completion order.
+        """
+        urls = iter(urls)
+        seen = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+
+            def submit_next() -> bool:
+                for url in urls:
+                    if url not in seen:
+                        seen.add(url)
+                        pending.add(executor.submit(self.fetch, url))
+                        return True
+                return False
+
+            while len(pending) < self.max_workers and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield future.result()
+                    submit_next()
+
+
+    def download_products(self, products: Iterable) -> Iterator[MediaResult]:
+        """
+        Download the media of many products, media shared between products is only fetched once.
+        Args:
+            products: Products or ProductResults, failed results are skipped.
+        Yields:
+            MediaResult for every distinct URL in completion order.
+        """
+        def media_urls():
+            for product in products:
+                if hasattr(product, 'error') and hasattr(product, 'product'): # ProductResult
+                    if product.error is not None:
+                        continue
+                    product = product.product
+                yield from product.media_urls
+
+        return self.download(media_urls())
+
+
+    def close(self):
+        """
+        Close the store's index file.
+        """
+        self.__index.close()
+
+
+    def __enter__(self) -> 'MediaStore':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
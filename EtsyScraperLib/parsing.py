@@ -0,0 +1,160 @@
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import List, Optional, Tuple, Union
+from EtsyScraperLib.instrumentation import timed
+
+
+DEFAULT_PARSER = 'html.parser'
+
+_default_parser = DEFAULT_PARSER
+_default_restrict = False
+
+
+class RegionStrainer(SoupStrainer):
+    def __init__(self, regions: List[Tuple[str, Optional[str], Optional[str]]]):
+        """
+        Only build the parts of a page that data is extracted from, everything else is skipped while parsing.
+        Args:
+            regions: List of (tag name, attribute, value) rules e.g. ('div', 'class', 'responsive-listing-grid'), attribute may be None to match on tag name alone.
+        """
+        super().__init__()
+        self.regions = regions
+
+
+    def matches(self, name: str, attrs: Optional[dict]) -> bool:
+        """
+        Check whether a tag opens one of the regions.
+        Args:
+            name: The tag name.
+            attrs: The raw attributes of the tag.
+        Returns:
+            True if the tag and its contents should be built.
+        """
+        attrs = attrs or {}
+        for region_name, attr, value in self.regions:
+            if name != region_name:
+                continue
+            if attr is None:
+                return True
+
+            found = attrs.get(attr)
+            if found is None:
+                continue
+            if attr == 'class':
+                classes = found.split() if isinstance(found, str) else list(found)
+                if (' '.join(classes) == value) if ' ' in value else (value in classes):
+                    return True
+            elif found == value:
+                return True
+
+        return False
+
+
+    def allow_tag_creation(self, nsprefix: Optional[str], name: str, attrs: Optional[dict]) -> bool:
+        """
+        Hook used by BeautifulSoup4 4.13 and newer while parsing.
+        """
+        return self.matches(name, attrs)
+
+
+    def allow_string_creation(self, string: str) -> bool:
+        """
+        Hook used by BeautifulSoup4 4.13 and newer, text outside of the regions is never kept.
+        """
+        return False
+
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        """
+        Hook used by BeautifulSoup4 versions before 4.13 while parsing.
+        """
+        if isinstance(markup_name, str):
+            return markup_name if self.matches(markup_name, markup_attrs) else None
+        return super().search_tag(markup_name, markup_attrs)
+
+
+# listing pages only need the grid of listing cards
+LISTING_STRAINER = RegionStrainer([
+    ('div', 'class', 'responsive-listing-grid')
+])
+
+# product pages only need the title, buy box, review badge, description toggle and media carousel
+PRODUCT_STRAINER = RegionStrainer([
+    ('title', None, None),
+    ('div', 'data-buy-box-region', 'price'),
+    ('span', 'class', 'wt-badge--statusInformational'),
+    ('div', 'id', 'wt-content-toggle-product-details-read-more'),
+    ('ul', 'class', 'carousel-pane-list')
+])
+
+
+def fastest_parser() -> str:
+    """
+    Get the fastest parser backend that is installed.
+    Returns:
+        'lxml' if it can be imported, otherwise 'html.parser'.
+    """
+    try:
+        import lxml # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return DEFAULT_PARSER
+
+
+def set_default_parser(parser: str):
+    """
+    Set the parser backend used by every Store and Product that doesn't choose its own.
+    Args:
+        parser: A BeautifulSoup4 backend e.g. 'html.parser', 'lxml', 'html5lib'
+    """
+    global _default_parser
+    _default_parser = parser
+
+
+def get_default_parser() -> str:
+    """
+    Get the parser backend used by every Store and Product that doesn't choose its own.
+    Returns:
+        String of the parser backend.
+    """
+    return _default_parser
+
+
+def set_restricted_parsing(restrict: bool):
+    """
+    Set whether listing and product pages only build the regions data is extracted from.
+    Args:
+        restrict: True to parse with the page strainers by default.
+    """
+    global _default_restrict
+    _default_restrict = restrict
+
+
+def get_restricted_parsing() -> bool:
+    """
+    Get whether listing and product pages only build the regions data is extracted from.
+    Returns:
+        True if restricted parsing is on by default.
+    """
+    return _default_restrict
+
+
+def make_soup(html: Union[str, bytes], parser: Optional[str] = None, strainer: Optional[SoupStrainer] = None,
+              restrict: Optional[bool] = None) -> BeautifulSoup:
+    """
+    Parse HTML with the configured backend.
+    Args:
+        html: The page HTML.
+        parser: The parser backend, defaults to the global default.
+        strainer: The regions of the page to build when parsing is restricted.
+        restrict: Whether to apply the strainer, defaults to the global setting.
+    Returns:
+        The parsed page.
+    """
+    parser = parser or _default_parser
+    if restrict is None:
+        restrict = _default_restrict
+
+    with timed('parse', parser=parser):
+        if restrict and strainer is not None:
+            return BeautifulSoup(html, parser, parse_only=strainer)
+        return BeautifulSoup(html, parser)
@@ -0,0 +1,363 @@
+import re
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Etsy shows its own short forms for the dollar currencies
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'GBP': '£',
+    'EUR': '€',
+    'JPY': '¥',
+    'INR': '₹',
+    'CAD': 'CA$',
+    'AUD': 'AU$',
+    'NZD': 'NZ$'
+}
+SYMBOL_CURRENCIES = {symbol: code for code, symbol in CURRENCY_SYMBOLS.items()}
+SYMBOL_CURRENCIES['US$'] = 'USD' # shown instead of '$' alongside other dollar currencies
+
+# digits after the decimal point, every currency not listed here has 2
+CURRENCY_EXPONENTS = {'JPY': 0, 'KRW': 0, 'HUF': 0, 'CLP': 0, 'ISK': 0, 'VND': 0}
+
+PRICE_PATTERN = re.compile(r'(?P<prefix>[^\d\s.,]*)\s*(?P<value>\d[\d.,\s]*)(?P<suffix>[^\d\s.,+]*)')
+MISSING = -1
+
+
+def minor_units(currency: str) -> int:
+    """
+    Get how many digits a currency has after the decimal point.
+    Args:
+        currency: The ISO 4217 code e.g. 'GBP'
+    Returns:
+        Integer of the digits, 2 for most currencies.
+    """
+    return CURRENCY_EXPONENTS.get(currency, 2)
+
+
+def normalise_value(value: str) -> Optional[Decimal]:
+    """
+    Read a price number written with either ',' or '.' as the decimal point e.g. 1,299.00 or 1.299,00
+    Args:
+        value: The number as shown on the page.
+    Returns:
+        Decimal of the number, None if it can't be read.
+    """
+    value = value.replace(' ', '').rstrip('.,')
+    if ',' in value and '.' in value:
+        decimal_point = ',' if value.rfind(',') > value.rfind('.') else '.'
+    elif ',' in value:
+        # a single comma followed by exactly two digits is a decimal point, otherwise it separates thousands
+        decimal_point = ',' if value.count(',') == 1 and len(value) - value.rfind(',') == 3 else None
+    else:
+        decimal_point = '.' if value.count('.') == 1 else None
+
+    thousands = {',', '.'} - {decimal_point}
+    for separator in thousands:
+        value = value.replace(separator, '')
+    if decimal_point == ',':
+        value = value.replace(',', '.')
+
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def _symbol_currency(symbol: str) -> Optional[str]:
+    """
+    Get the currency a symbol or code written next to a price stands for.
+    Args:
+        symbol: The text before or after the number e.g. '$', 'US$', '€', 'EUR'
+    Returns:
+        String of the ISO 4217 code, None if the text isn't a currency.
+    """
+    symbol = symbol.strip()
+    if symbol in SYMBOL_CURRENCIES:
+        return SYMBOL_CURRENCIES[symbol]
+    if symbol.isalpha() and len(symbol) == 3:
+        return symbol.upper()
+    return None
+
+
+def parse_price(price: str, currency: Optional[str] = None) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Split a price as Etsy shows it into its currency and an integer amount in minor units e.g. $19.16 is ('USD', 1916).
+    Args:
+        price: The price e.g. '$19.16', '£24.99+', 'CA$1,299.00', 'US$5.00', 'EUR 12,50', '19,16 €'
+        currency: The ISO 4217 code to use when the price has no symbol.
+    Returns:
+        Tuple of the currency code and amount, (None, None) if the price can't be read.
+    """
+    if not price:
+        return None, None
+
+    match = PRICE_PATTERN.search(price)
+    if match is None:
+        return None, None
+
+    currency = _symbol_currency(match.group('prefix')) or _symbol_currency(match.group('suffix')) or currency
+
+    value = normalise_value(match.group('value'))
+    if value is None:
+        return None, None
+
+    return currency, int((value * (10 ** minor_units(currency or ''))).to_integral_value())
+
+
+def format_amount(currency: Optional[str], amount: int) -> str:
+    """
+    Format an amount in minor units back into a price e.g. ('GBP', 2499) is £24.99
+    Args:
+        currency: The ISO 4217 code.
+        amount: The amount in minor units.
+    Returns:
+        String of the price.
+    """
+    digits = minor_units(currency or '')
+    symbol = CURRENCY_SYMBOLS.get(currency, f'{currency} ' if currency else '')
+    if digits == 0:
+        return f'{symbol}{amount}'
+    return f'{symbol}{amount / (10 ** digits):.{digits}f}'
+
+
+class PriceColumn:
+    __slots__ = ('amounts', 'currencies', 'codes')
+
+    def __init__(self, prices: Iterable[Tuple[Optional[str], Optional[int]]] = ()):
+        """
+        A store's prices packed into arrays, amounts in minor units alongside an index into a table of currencies.
+        Args:
+            prices: (currency, amount) pairs to start the column with.
+        """
+        self.amounts = array('q')
+        self.currencies = array('B')
+        self.codes: List[Optional[str]] = [None]
+        for currency, amount in prices:
+            self.append(currency, amount)
+
+
+    @classmethod
+    def from_listings(cls, listings: Iterable) -> 'PriceColumn':
+        """
+        Build a column from listings.
+        Args:
+            listings: Listing objects or a ListingColumns.
+        Returns:
+            The PriceColumn.
+        """
+        column = getattr(listings, 'amounts', None)
+        if isinstance(column, PriceColumn):
+            return column
+        return cls((listing.currency, listing.amount) for listing in listings)
+
+
+    def append(self, currency: Optional[str], amount: Optional[int]):
+        """
+        Add a price to the end of the column.
+        Args:
+            currency: The ISO 4217 code.
+            amount: The amount in minor units, None if the price couldn't be read.
+        """
+        if currency not in self.codes:
+            self.codes.append(currency)
+        self.currencies.append(self.codes.index(currency))
+        self.amounts.append(MISSING if amount is None else amount)
+
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+
+    def __getitem__(self, index: int) -> Tuple[Optional[str], Optional[int]]:
+        amount = self.amounts[index]
+        if amount == MISSING:
+            return None, None
+        return self.codes[self.currencies[index]], amount
+
+
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the column's arrays.
+        Returns:
+            Integer of bytes.
+        """
+        return self.amounts.itemsize * len(self.amounts) + self.currencies.itemsize * len(self.currencies)
+
+
+    def arrays(self):
+        """
+        Get numpy views of the column's arrays, without copying them. Only available when numpy is installed.
+        Returns:
+            Tuple of the int64 amounts and the uint8 indexes into 'codes'
+        """
+        amounts = numpy.frombuffer(self.amounts, dtype=numpy.int64) if len(self.amounts) else numpy.empty(0, dtype=numpy.int64)
+        currencies = numpy.frombuffer(self.currencies, dtype=numpy.uint8) if len(self.currencies) else numpy.empty(0, dtype=numpy.uint8)
+        return amounts, currencies
+
+
+    def main_currency(self) -> Optional[str]:
+        """
+        Get the currency most of the prices are in.
+        Returns:
+            String of the ISO 4217 code, None if there are no prices.
+        """
+        counts = Counter(compress(self.currencies, (amount != MISSING for amount in self.amounts)))
+        if not counts:
+            return None
+        return self.codes[counts.most_common(1)[0][0]]
+
+
+    def values(self, currency: Optional[str] = None):
+        """
+        Get every readable amount in one currency.
+        Args:
+            currency: The ISO 4217 code, defaults to the main currency.
+        Returns:
+            A numpy int64 array if numpy is installed, otherwise an array('q')
+        """
+        currency = currency or self.main_currency()
+        if currency not in self.codes:
+            return numpy.empty(0, dtype=numpy.int64) if numpy is not None else array('q')
+        code = self.codes.index(currency)
+
+        if numpy is not None:
+            amounts, currencies = self.arrays()
+            return amounts[(currencies == code) & (amounts != MISSING)]
+
+        return array('q', compress(self.amounts, (c == code and a != MISSING for c, a in zip(self.currencies, self.amounts))))
+
+
+def price_summary(column: PriceColumn, currency: Optional[str] = None) -> Dict[str, object]:
+    """
+    Get bulk statistics over a store's prices.
+    Args:
+        column: The store's prices e.g. 'Store.price_column()'
+        currency: The ISO 4217 code to summarise, defaults to the main currency. Prices in other currencies are skipped.
+    Returns:
+        Dictionary of 'currency', 'count' and the 'min', 'max', 'mean' and 'median' amounts in minor units.
+    """
+    currency = currency or column.main_currency()
+    values = column.values(currency)
+    count = len(values)
+    if count == 0:
+        return {'currency': currency, 'count': 0, 'min': None, 'max': None, 'mean': None, 'median': None}
+
+    if numpy is not None:
+        return {
+            'currency': currency,
+            'count': count,
+            'min': int(values.min()),
+            'max': int(values.max()),
+            'mean': float(values.mean()),
+            'median': float(numpy.median(values))
+        }
+
+    ordered = sorted(values)
+    middle = count // 2
+    median = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return {
+        'currency': currency,
+        'count': count,
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': sum(ordered) / count,
+        'median': float(median)
+    }
+
+
+def price_histogram(column: PriceColumn, edges: Sequence[int], currency: Optional[str] = None) -> List[int]:
+    """
+    Count a store's prices into buckets.
+    Args:
+        column: The store's prices.
+        edges: Ascending bucket edges in minor units e.g. [0, 1000, 2500, 5000], the last bucket includes its upper edge.
+        currency: The ISO 4217 code, defaults to the main currency.
+    Returns:
+        List of counts, one per bucket (len(edges) - 1), prices outside the edges aren't counted.
+    """
+    values = column.values(currency)
+    if numpy is not None:
+        counts, _ = numpy.histogram(values, bins=numpy.asarray(edges))
+        return [int(count) for count in counts]
+
+    counts = [0] * (len(edges) - 1)
+    last = len(edges) - 1
+    for value in values:
+        if value < edges[0] or value > edges[-1]:
+            continue
+        counts[min(bisect_right(edges, value), last) - 1] += 1
+    return counts
+
+
+def _keyed_column(listings: Iterable) -> Tuple[List[str], PriceColumn]:
+    """
+    Get the key of every listing alongside its prices, reading a ListingColumns' columns directly.
+    Listings are keyed the same way 'StoreDiff' matches them, so both agree on which listings are the same.
+    Args:
+        listings: Listing objects or a ListingColumns.
+    Returns:
+        Tuple of the listing keys and the PriceColumn, in the same order.
+    """
+    from EtsyScraperLib.incremental import listing_key # imported here as records imports this module
+
+    if isinstance(getattr(listings, 'amounts', None), PriceColumn):
+        return listings.listing_keys(), listings.amounts
+    listings = list(listings)
+    return [listing_key(listing) for listing in listings], PriceColumn.from_listings(listings)
+
+
+def price_deltas(previous: Iterable, current: Iterable) -> List[Tuple[str, str, int, int]]:
+    """
+    Find listings whose price changed between two crawls, e.g. discounts.
+    Listings are matched by key once, then the prices are compared over the two crawls' PriceColumn arrays.
+    Args:
+        previous: The listings of the earlier crawl, Listing objects or a ListingColumns.
+        current: The listings of the later crawl.
+    Returns:
+        List of (listing ID, currency, previous amount, current amount) for prices that changed within the same currency,
+        the change is current - previous and negative for a discount.
+    """
+    previous_keys, before = _keyed_column(previous)
+    current_keys, after = _keyed_column(current)
+
+    # the first readable price of each listing in the earlier crawl
+    positions = {}
+    for i, (key, amount) in enumerate(zip(previous_keys, before.amounts)):
+        if amount != MISSING:
+            positions.setdefault(key, i)
+    matches = [positions.get(key, MISSING) for key in current_keys]
+
+    # each column numbers its currencies separately, so the earlier crawl's indexes are translated to the later one's
+    translated = [after.codes.index(code) if code in after.codes else MISSING for code in before.codes]
+
+    if numpy is not None:
+        matched = numpy.asarray(matches, dtype=numpy.int64)
+        rows = numpy.flatnonzero(matched != MISSING)
+        matched = matched[rows]
+        old_amounts, old_currencies = before.arrays()
+        new_amounts, new_currencies = after.arrays()
+        old, new = old_amounts[matched], new_amounts[rows]
+        same_currency = numpy.asarray(translated, dtype=numpy.int64)[old_currencies[matched]] == new_currencies[rows]
+        changed = same_currency & (new != MISSING) & (new != old)
+        return [(current_keys[row], after.codes[new_currencies[row]], int(old_amount), int(new_amount))
+                for row, old_amount, new_amount in zip(rows[changed].tolist(), old[changed], new[changed])]
+
+    deltas = []
+    for row, match in enumerate(matches):
+        if match == MISSING:
+            continue
+        amount = after.amounts[row]
+        if amount == MISSING or amount == before.amounts[match] or translated[before.currencies[match]] != after.currencies[row]:
+            continue
+        deltas.append((current_keys[row], after.codes[after.currencies[row]], before.amounts[match], amount))
+    return deltas
@@ -1,114 +1,223 @@
-from bs4 import BeautifulSoup
 import requests
 import json
+import logging
 import re
-from typing import List, Union
-from text_format import format_title
-from text_format import format_description
+from typing import Iterable, List, Optional
+from EtsyScraperLib.text_format import format_title
+from EtsyScraperLib.text_format import format_description
+from EtsyScraperLib.transport import Transport, get_default_transport
+from EtsyScraperLib.parsing import PRODUCT_STRAINER, make_soup
+from EtsyScraperLib.structured import extract_product_ld, script_product_fields
+from EtsyScraperLib.streaming import PRODUCT_FIELD_REGIONS, fetch_partial
+from EtsyScraperLib.prices import parse_price
+from EtsyScraperLib.lazy import LazyField, fills
+from EtsyScraperLib.instrumentation import increment, logger, selector_failed, timed
 
 class Product:
-    # Product info
-    title: str = ''
-    price: str = ''
-    description: str = ''
-    review_quantity: int = 0
-    media_urls: List[str] = []
+    # Product info, each field is extracted the first time it's read unless its getter has been called
+    title: str = LazyField('get_title', '')
+    price: str = LazyField('get_price', '')
+    currency: Optional[str] = LazyField('get_price')
+    amount: Optional[int] = LazyField('get_price')
+    description: str = LazyField('get_description', '')
+    review_quantity: int = LazyField('get_review_quantity', 0)
+    media_urls: List[str] = LazyField('parse_media', factory=list) # per instance so concurrently scraped products don't share media
     
     # Beautiful Soup info
     soup: str = ''
 
 
-    def __init__(self, product_url: str):
+    def __init__(self, product_url: str, transport: Optional[Transport] = None, parser: Optional[str] = None,
+                 restrict: Optional[bool] = None, structured: bool = True):
         """
         Sets up the product you want to scrape data from.
         Args:
             product_url: The URL of the product you want to scrape data from.
+            transport: The pooled HTTP transport to issue requests with, defaults to the process-wide transport.
+            parser: The BeautifulSoup4 backend e.g. 'lxml', defaults to the global parser.
+            restrict: Whether only the title, buy box, description and media carousel are built, defaults to the global setting.
+            structured: Read fields from the page's embedded JSON-LD first, the page is only parsed for fields it doesn't hold.
         """
         self.product_url = product_url
+        self.transport = transport or get_default_transport()
+        self.parser = parser
+        self.restrict = restrict
+        self.structured = structured
+        self.__page_html = None
+        self.__structured_fields = {}
+        self.__loaded = False
 
     
-    def connect(self):
+    def connect(self, fields: Optional[Iterable[str]] = None):
         """
         Issue a GET request to the Etsy store to retrieve the HTML data.
+        Args:
+            fields: Only download the page until these fields have arrived, any of 'title', 'price', 'description',
+                'review_quantity' and 'media_urls'. Other fields may then be missing. Defaults to the whole page.
         """
         try:
-            request = requests.get(self.product_url)
-            request.raise_for_status()  # checks for non-2xx status codes
+            if fields is None:
+                request = self.transport.get(self.product_url)
+                request.raise_for_status()  # checks for non-2xx status codes
+                page_html = request.text
+            else:
+                page_html = fetch_partial(self.transport, self.product_url, PRODUCT_FIELD_REGIONS, fields,
+                                          on_ld_json=script_product_fields if self.structured else None)
 
-            print('[?] Request was successful.')
-            page_html = request.text
-            self.soup = BeautifulSoup(page_html, 'html.parser')
+            logger.debug('Fetched %s', self.product_url)
+            self.load_html(page_html)
 
         except requests.exceptions.RequestException as e:
-            print('[!] Request failed', e)
+            logger.error('Request failed for %s: %s', self.product_url, e)
+            increment('request_failures')
+
+
+    def load_html(self, page_html: str):
+        """
+        Load product page HTML that has already been downloaded.
+        When 'structured' is on the embedded JSON-LD is read straight away and the page is only parsed if a field is missing from it.
+        Args:
+            page_html: The HTML of the product page.
+        """
+        self.__loaded = True
+        if not self.structured:
+            self.soup = make_soup(page_html, self.parser, PRODUCT_STRAINER, self.restrict)
+            return
+
+        with timed('extract', page='product_ld'):
+            self.__structured_fields = extract_product_ld(page_html)
+        self.__page_html = page_html
+        self.soup = None
+
+
+    def ensure_loaded(self, field: Optional[str] = None):
+        """
+        Fetch the product page if it hasn't been fetched or loaded, used before any field is extracted so getters,
+        'get_all_data()' and lazy reads all work without 'connect()'.
+        Args:
+            field: The field about to be extracted.
+        """
+        if not self.__loaded:
+            self.__loaded = True # a failed request isn't repeated for every field read
+            self.connect()
+
+
+    def __get_soup(self):
+        """
+        Get the parsed page, parsing it the first time a field has to be read from the DOM.
+        Returns:
+            The parsed page.
+        """
+        self.ensure_loaded()
+        if self.soup is None and self.__page_html is not None:
+            self.soup = make_soup(self.__page_html, self.parser, PRODUCT_STRAINER, self.restrict)
+            self.__page_html = None
+        return self.soup
+
+
+    def __from_structured(self, field: str) -> bool:
+        """
+        Fill in a field from the page's JSON-LD.
+        Args:
+            field: The attribute to fill in e.g. 'title', 'media_urls'
+        Returns:
+            True if the JSON-LD held the field, False if it has to be read from the DOM.
+        """
+        self.ensure_loaded()
+        if field not in self.__structured_fields:
+            if self.structured:
+                increment('structured_fallbacks', field=field)
+            return False
+
+        value = self.__structured_fields[field]
+        setattr(self, field, list(value) if isinstance(value, list) else value)
+        return True
     
 
+    @fills('title')
     def get_title(self) -> str:
         """
         Extract the title of the product.
         Returns:
             String of product title.
         """
+        if self.__from_structured('title'):
+            return self.title
+
         try:
-            self.title = format_title(self.soup.title.text)
+            self.title = format_title(self.__get_soup().title.text)
         except AttributeError:
-            print('[AttributeError]: Title couldn\'t be found.')
+            selector_failed('product.title', 'Title couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.title', f'Couldn\'t read the title: {e}', logging.ERROR)
         finally:
             return self.title
 
     
+    @fills('description')
     def get_description(self) -> str:
         """
         Extract the description of the product.
         Returns:
             String of product description. 
         """
+        if self.__from_structured('description'):
+            return self.description
+
         try:
-            description_toggle = self.soup.find('div', {'id': 'wt-content-toggle-product-details-read-more'})
+            description_toggle = self.__get_soup().find('div', {'id': 'wt-content-toggle-product-details-read-more'})
             paragraph = description_toggle.find('p').text
             self.description = format_description(paragraph)
         except AttributeError:
-            print('[AttributeError]: Description couldn\'t be found.')
+            selector_failed('product.description', 'Description couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.description', f'Couldn\'t read the description: {e}', logging.ERROR)
         finally:
             return self.description
 
 
+    @fills('price', 'currency', 'amount')
     def get_price(self) -> str:
         """
-        Extract the price of the product.
+        Extract the price of the product, 'currency' and 'amount' are filled in from it.
         Returns:
             String of product price.
         """
+        if self.__from_structured('price'):
+            self.currency, self.amount = parse_price(self.price)
+            return self.price
+
         try:
-            price_box = self.soup.find('div', {'data-buy-box-region': 'price'})
+            price_box = self.__get_soup().find('div', {'data-buy-box-region': 'price'})
             price = price_box.find('p', {'class': re.compile(r'\btitle\b', re.I)})
             format_price = price.text.replace('Price:', '').strip()
             self.price = format_price
+            self.currency, self.amount = parse_price(self.price)
         except AttributeError:
-            print('[AttributeError]: Price couldn\'t be found.')
+            selector_failed('product.price', 'Price couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.price', f'Couldn\'t read the price: {e}', logging.ERROR)
         finally:
             return self.price
 
 
+    @fills('review_quantity')
     def get_review_quantity(self) -> int:
         """
         Extract the quantity of reviews for this product.
         Returns:
             Integer of the review quantity.
         """
+        if self.__from_structured('review_quantity'):
+            return self.review_quantity
+
         try:
-            review_quantity = self.soup.find('span', {'class': 'wt-badge--statusInformational'})
+            review_quantity = self.__get_soup().find('span', {'class': 'wt-badge--statusInformational'})
             self.review_quantity = int(review_quantity.text.lstrip().rstrip())
         except AttributeError:
-            print('[AttributeError]: Reviews couldn\'t be found.')
+            selector_failed('product.review_quantity', 'Reviews couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.review_quantity', f'Couldn\'t read the review quantity: {e}', logging.ERROR)
         finally:
             return self.review_quantity
             
@@ -130,9 +239,9 @@ class Product:
                         url = url.strip().split(' ')[0]
                         self.media_urls.append(url)
         except AttributeError:
-            print(f'[AttributeError]: Images couldn\'t be parsed.')
+            selector_failed('product.images', 'Images couldn\'t be parsed.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.images', f'Couldn\'t read the images: {e}', logging.ERROR)
 
 
     def __parse_videos(self, li:str):
@@ -147,19 +256,23 @@ class Product:
                 source = video.find('source').get('src')
                 self.media_urls.append(source)
         except AttributeError:
-            print('[AttributeError]: Videos couldn\'t be found.')
+            selector_failed('product.videos', 'Videos couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.videos', f'Couldn\'t read the videos: {e}', logging.ERROR)
 
 
+    @fills('media_urls')
     def parse_media(self) -> List[str]:
         """
         Parse the product images & video links (highest quality).
         Returns:
             List of media URLs.
         """
+        if self.__from_structured('media_urls'):
+            return self.media_urls
+
         try:
-            ul = self.soup.find('ul', {'class': 'carousel-pane-list'})
+            ul = self.__get_soup().find('ul', {'class': 'carousel-pane-list'})
             all_li = ul.find_all('li', {'class': 'carousel-pane'})
 
             for li in all_li:
@@ -167,8 +280,7 @@ class Product:
                 self.__parse_videos(li)
 
         except Exception as e:
-            # Handle any exceptions that may occur during parsing
-            print(f'[Error Occurred]: {e}')
+            selector_failed('product.media', f'Couldn\'t read the media: {e}', logging.ERROR)
         finally:
             return self.media_urls
 
@@ -177,21 +289,23 @@ class Product:
         """
         Get all data from the store.
         """
-        print("[?] Collecting product data, this may take a few seconds...")
-        self.get_title()
-        self.get_description()
-        self.get_price()
-        self.get_review_quantity()
-        self.parse_media()
+        logger.info('Collecting product data for %s', self.product_url)
+        self.ensure_loaded()
+        with timed('extract', page='product'):
+            self.get_title()
+            self.get_description()
+            self.get_price()
+            self.get_review_quantity()
+            self.parse_media()
 
     
-    def generate_json(self) -> str:
+    def to_dict(self) -> dict:
         """
-        Formats product data into JSON.
+        Formats product data into a dictionary.
         Returns:
-            JSON formatted store data.
+            Dictionary of product data.
         """
-        product_data = {
+        return {
             'productName': self.title,
             'productDescription': self.description,
             'productPrice': self.price,
@@ -199,6 +313,15 @@ class Product:
             'media': self.media_urls
         }
 
+
+    def generate_json(self) -> str:
+        """
+        Formats product data into JSON.
+        Returns:
+            JSON formatted store data.
+        """
+        product_data = self.to_dict()
+
         json_data = json.dumps(product_data, indent=4)
 
         return json_data
\ No newline at end of file
@@ -0,0 +1,171 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Read a 'Retry-After' header, which is either a number of seconds or an HTTP date.
+    Args:
+        value: The header value.
+    Returns:
+        Float of seconds to wait, None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 4, backoff: float = 0.5, max_backoff: float = 30.0,
+                 statuses: Iterable[int] = RETRY_STATUSES):
+        """
+        How failed requests are retried, waits grow exponentially with full jitter.
+        Args:
+            max_retries: The number of retries after the first attempt, 0 disables retrying.
+            backoff: The base wait in seconds, attempt n waits up to backoff * 2^n.
+            max_backoff: The longest wait between attempts in seconds.
+            statuses: Response status codes that are retried.
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Get how long to wait before the next attempt.
+        Args:
+            attempt: The number of the attempt that just failed, starting at 0.
+            retry_after: Seconds the server asked us to wait, this is always honoured.
+        Returns:
+            Float of seconds to wait.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class _Bucket:
+    __slots__ = ('rate', 'tokens', 'updated', 'blocked_until', 'lock')
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 5.0, burst: float = 5.0, min_rate: float = 0.2, max_rate: Optional[float] = None,
+                 increase: float = 0.05, decrease: float = 0.5):
+        """
+        A per-host token bucket that slows down when Etsy throttles and speeds back up while requests succeed.
+        Args:
+            rate: Starting requests per second for each host, 0 or less disables limiting.
+            burst: The most requests that can be sent back to back.
+            min_rate: The slowest the rate can be cut to.
+            max_rate: The fastest the rate can grow to, defaults to twice the starting rate.
+            increase: Requests per second added after every successful response.
+            decrease: Multiplier applied to the rate after a throttled response.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 2
+        self.increase = increase
+        self.decrease = decrease
+        self.__buckets: Dict[str, _Bucket] = {}
+        self.__lock = threading.Lock()
+
+
+    def __bucket(self, url: str) -> _Bucket:
+        """
+        Get the bucket for a URL's host, creating it on first use.
+        Args:
+            url: The URL being requested.
+        Returns:
+            The host's bucket.
+        """
+        host = urlsplit(url).netloc
+        bucket = self.__buckets.get(host)
+        if bucket is None:
+            with self.__lock:
+                bucket = self.__buckets.setdefault(host, _Bucket(self.rate, self.burst))
+        return bucket
+
+
+    def acquire(self, url: str):
+        """
+        Block until a request to the URL's host is allowed.
+        Args:
+            url: The URL about to be requested.
+        """
+        if self.rate <= 0:
+            return
+
+        bucket = self.__bucket(url)
+        while True:
+            with bucket.lock:
+                now = time.monotonic()
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+                bucket.updated = now
+
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                elif bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                else:
+                    wait = (1 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+
+
+    def feedback(self, url: str, status_code: int, retry_after: Optional[float] = None):
+        """
+        Adjust the host's rate based on how a request went.
+        Args:
+            url: The URL that was requested.
+            status_code: The response status code.
+            retry_after: Seconds the server asked us to wait.
+        """
+        if self.rate <= 0:
+            return
+
+        bucket = self.__bucket(url)
+        with bucket.lock:
+            if status_code in THROTTLE_STATUSES:
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.tokens = 0
+                if retry_after:
+                    bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+            elif status_code < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+
+    def current_rate(self, url: str) -> float:
+        """
+        Get the requests per second currently allowed for a URL's host.
+        Args:
+            url: Any URL on the host.
+        Returns:
+            Float of requests per second.
+        """
+        return self.__bucket(url).rate
@@ -0,0 +1,277 @@
+import re
+from array import array
+from typing import Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+from EtsyScraperLib.prices import PriceColumn, parse_price
+
+
+LISTING_ID_PATTERN = re.compile(r'/listing/(\d+)')
+
+
+def url_listing_id(url: str) -> str:
+    """
+    Get the listing ID of a product URL.
+    Args:
+        url: The product URL.
+    Returns:
+        String of the listing ID, or the URL if it doesn't contain one.
+    """
+    match = LISTING_ID_PATTERN.search(url)
+    return match.group(1) if match else url
+
+
+def canonical_listing_url(url: str) -> str:
+    """
+    Strip the tracking query string and fragment from a listing link, so the same listing always has the same URL
+    e.g. https://www.etsy.com/uk/listing/1573434449/item-title-1?ref=shop_home_active_3&frs=1
+    becomes https://www.etsy.com/uk/listing/1573434449/item-title-1
+    Args:
+        url: The href of the listing link.
+    Returns:
+        String of the canonical URL, unchanged if it isn't a listing URL.
+    """
+    parts = urlsplit(url)
+    if not LISTING_ID_PATTERN.search(parts.path):
+        return url
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+
+
+class Listing:
+    __slots__ = ('title', 'url', 'price', 'currency', 'amount')
+
+    def __init__(self, title: str, url: str, price: str, currency: Optional[str] = None, amount: Optional[int] = None):
+        """
+        A single product as shown on a store's listing page.
+        Args:
+            title: The product title.
+            url: The product URL.
+            price: The product price including the currency symbol e.g. $19.16
+            currency: The ISO 4217 code of the price e.g. USD, read from 'price' if it isn't given.
+            amount: The price in minor units e.g. 1916, read from 'price' if it isn't given.
+        """
+        self.title = title
+        self.url = url
+        self.price = price
+        if amount is None:
+            currency, amount = parse_price(price, currency)
+        self.currency = currency
+        self.amount = amount
+
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Listing):
+            return NotImplemented
+        return (self.title, self.url, self.price) == (other.title, other.url, other.price)
+
+
+    def __hash__(self) -> int:
+        return hash((self.title, self.url, self.price))
+
+
+    def __repr__(self) -> str:
+        return f'Listing(title={self.title!r}, url={self.url!r}, price={self.price!r})'
+
+
+    @property
+    def listing_id(self) -> Optional[str]:
+        """
+        The Etsy listing ID taken from the URL e.g. 1573434449, None if the URL doesn't contain one.
+        """
+        match = LISTING_ID_PATTERN.search(self.url)
+        return match.group(1) if match else None
+
+
+    def to_dict(self) -> dict:
+        """
+        Formats the listing the same way as 'Store.generate_json()'
+        Returns:
+            Dictionary of the product title, URL and price.
+        """
+        return {'produceTitle': self.title, 'productURL': self.url, 'productPrice': self.price}
+
+
+class StringColumn:
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self, values: Iterable[str] = ()):
+        """
+        A column of strings packed into one UTF-8 buffer with an array of offsets, rather than one object per value.
+        Args:
+            values: Strings to start the column with.
+        """
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+        for value in values:
+            self.append(value)
+
+
+    def append(self, value: str):
+        """
+        Add a string to the end of the column.
+        Args:
+            value: The string to add.
+        """
+        self._data += value.encode('utf-8')
+        self._offsets.append(len(self._data))
+
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('column index out of range')
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the column's buffers.
+        Returns:
+            Integer of bytes.
+        """
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+class ListingColumns:
+    __slots__ = ('titles', 'urls', 'prices', 'amounts')
+
+    def __init__(self, listings: Iterable[Listing] = ()):
+        """
+        A columnar container of listings for large stores, each field is kept in its own packed column.
+        Listings are materialised only when they're read.
+        Args:
+            listings: Listings to start the container with.
+        """
+        self.titles = StringColumn()
+        self.urls = StringColumn()
+        self.prices = StringColumn()
+        self.amounts = PriceColumn()
+        self.extend(listings)
+
+
+    def append(self, listing: Listing):
+        """
+        Add a listing to the end of the container.
+        Args:
+            listing: The listing to add.
+        """
+        self.titles.append(listing.title)
+        self.urls.append(listing.url)
+        self.prices.append(listing.price)
+        self.amounts.append(listing.currency, listing.amount)
+
+
+    def extend(self, listings: Iterable[Listing]):
+        """
+        Add several listings to the end of the container.
+        Args:
+            listings: The listings to add.
+        """
+        for listing in listings:
+            self.append(listing)
+
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+
+    def __getitem__(self, index: int) -> Listing:
+        return Listing(self.titles[index], self.urls[index], self.prices[index], *self.amounts[index])
+
+
+    def __iter__(self) -> Iterator[Listing]:
+        for i, (title, url, price) in enumerate(zip(self.titles, self.urls, self.prices)):
+            yield Listing(title, url, price, *self.amounts[i])
+
+
+    def listing_keys(self) -> List[str]:
+        """
+        Get the key of every listing without materialising them, the same as 'incremental.listing_key()'
+        Returns:
+            List of keys in the container's order.
+        """
+        return [url_listing_id(url) for url in self.urls]
+
+
+    def nbytes(self) -> int:
+        """
+        Get the memory used by every column's buffers.
+        Returns:
+            Integer of bytes.
+        """
+        return self.titles.nbytes() + self.urls.nbytes() + self.prices.nbytes() + self.amounts.nbytes()
+
+
+class StoreSnapshot:
+    __slots__ = (
+        'store_name', 'store_description', 'store_location', 'store_logo', 'store_banner', 'product_quantity',
+        'sales_quantity', 'admirers', 'review_quantity', 'review_rating', 'listings', 'page_fingerprints'
+    )
+
+    def __init__(self, store_name: str, store_description: str = '', store_location: str = '', store_logo: str = '',
+                 store_banner: str = '', product_quantity: int = 0, sales_quantity: int = 0, admirers: int = 0,
+                 review_quantity: int = 0, review_rating: float = 0.0,
+                 listings: Optional[Union[List[Listing], ListingColumns]] = None,
+                 page_fingerprints: Optional[List[str]] = None):
+        """
+        The data collected from a store at one point in time.
+        Args:
+            store_name: The name of the store.
+            store_description: The store description.
+            store_location: The store location.
+            store_logo: The URL of the store logo.
+            store_banner: The URL of the store banner.
+            product_quantity: The amount of products for sale.
+            sales_quantity: The amount of sales the store has had.
+            admirers: The amount of admirers the store has.
+            review_quantity: The amount of reviews the store has.
+            review_rating: The store's review rating.
+            listings: The store's listings, either a list or a ListingColumns.
+            page_fingerprints: A hash of the listing IDs on each listing page, used by incremental re-crawls.
+        """
+        self.store_name = store_name
+        self.store_description = store_description
+        self.store_location = store_location
+        self.store_logo = store_logo
+        self.store_banner = store_banner
+        self.product_quantity = product_quantity
+        self.sales_quantity = sales_quantity
+        self.admirers = admirers
+        self.review_quantity = review_quantity
+        self.review_rating = review_rating
+        self.listings = listings if listings is not None else []
+        self.page_fingerprints = page_fingerprints if page_fingerprints is not None else []
+
+
+    def to_dict(self, include_listings: bool = True) -> dict:
+        """
+        Formats the snapshot the same way as 'Store.generate_json()'
+        Args:
+            include_listings: Whether to include 'storeProductDetails'
+        Returns:
+            Dictionary of store data.
+        """
+        store_data = {
+            'storeName': self.store_name,
+            'storeDescription': self.store_description,
+            'storeLocation': self.store_location,
+            'storeLogo': self.store_logo,
+            'storeBannerImage': self.store_banner,
+            'storeProductQuantity': self.product_quantity,
+            'storeSalesQuantity': self.sales_quantity,
+            'storeAdmirers': self.admirers,
+            'storeReviewQuantity': self.review_quantity,
+            'storeReviewRating': self.review_rating
+        }
+        if include_listings:
+            store_data['storeProductDetails'] = [listing.to_dict() for listing in self.listings]
+        return store_data
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import heapq
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from EtsyScraperLib.store import Store
+from EtsyScraperLib.records import StoreSnapshot
+from EtsyScraperLib.transport import Transport, get_default_transport
+from EtsyScraperLib.instrumentation import logger
+
+
+class CrawlCheckpoint:
+    def __init__(self, path: str):
+        """
+        An append-only record of the stores a crawl has finished, so a killed crawl can resume where it left off.
+        Each finished store is one JSON line, a line cut short by the process being killed is ignored.
+        Args:
+            path: The checkpoint file, it is created if it doesn't exist.
+        """
+        self.path = path
+        self.completed: Dict[str, float] = {}
+        self.__lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        self.completed[entry['store']] = entry['completed_at']
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+        self.__file = open(path, 'a', encoding='utf-8')
+
+
+    def is_complete(self, store_name: str) -> bool:
+        """
+        Check whether a store was finished by this or an earlier run.
+        Args:
+            store_name: The name of the store.
+        Returns:
+            True if the store doesn't need crawling again.
+        """
+        return store_name in self.completed
+
+
+    def mark_complete(self, store_name: str):
+        """
+        Record that a store has been finished, the line is flushed straight away.
+        Args:
+            store_name: The name of the store.
+        """
+        completed_at = time.time()
+        with self.__lock:
+            self.completed[store_name] = completed_at
+            self.__file.write(json.dumps({'store': store_name, 'completed_at': completed_at}) + '\n')
+            self.__file.flush()
+
+
+    def close(self):
+        """
+        Close the checkpoint file.
+        """
+        self.__file.close()
+
+
+    def __enter__(self) -> 'CrawlCheckpoint':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CrawlResult:
+    __slots__ = ('store_name', 'snapshot', 'error', 'pages_fetched')
+
+    def __init__(self, store_name: str, snapshot: Optional[StoreSnapshot] = None, error: Optional[str] = None,
+                 pages_fetched: int = 0):
+        """
+        The outcome of crawling one store.
+        Args:
+            store_name: The name of the store.
+            snapshot: The store's data, None if it failed.
+            error: Why the store failed, None if it succeeded.
+            pages_fetched: The number of shop and listing pages downloaded.
+        """
+        self.store_name = store_name
+        self.snapshot = snapshot
+        self.error = error
+        self.pages_fetched = pages_fetched
+
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the store was crawled successfully.
+        """
+        return self.error is None
+
+
+class _StoreCrawl:
+    __slots__ = ('rank', 'store', 'remaining', 'failed_pages', 'pages_fetched')
+
+    def __init__(self, rank: int, store: Store):
+        self.rank = rank
+        self.store = store
+        self.remaining = 0
+        self.failed_pages: List[int] = []
+        self.pages_fetched = 0
+
+
+class CrawlScheduler:
+    def __init__(self, store_names: Iterable[str], transport: Optional[Transport] = None, max_workers: int = 16,
+                 checkpoint: Optional[CrawlCheckpoint] = None, priority: Optional[Callable[[str], object]] = None,
+                 parser: Optional[str] = None, restrict: Optional[bool] = None,
+                 parse_executor: Optional[Executor] = None, columnar: bool = False):
+        """
+        Crawls many stores at once, interleaving their shop and listing pages under one concurrency and rate budget.
+        Listing pages of stores that have already started are fetched before new stores are started, so only a
+        handful of stores are held in memory at a time.
+        Args:
+            store_names: The names of the stores to crawl.
+            transport: The transport every request is issued through, its rate limiter is the crawl's rate budget.
+                Defaults to the process-wide transport.
+            max_workers: The most pages fetched at once across every store. Keep this at or below the transport's pool size.
+            checkpoint: Where finished stores are recorded, stores it already holds are skipped.
+            priority: Called with each store name, stores are crawled from the lowest value up e.g. the time each
+                store was last crawled so the stalest go first. Defaults to the order given.
+            parser: The BeautifulSoup4 backend e.g. 'lxml', defaults to the global parser.
+            restrict: Whether listing pages only build the listing grid, defaults to the global setting.
+            parse_executor: An optional process pool that listing pages are parsed in.
+            columnar: Keep each store's listings in packed columns.
+        """
+        self.store_names = list(dict.fromkeys(store_names))
+        self.transport = transport or get_default_transport()
+        self.max_workers = max(1, max_workers)
+        self.checkpoint = checkpoint
+        self.priority = priority
+        self.parser = parser
+        self.restrict = restrict
+        self.parse_executor = parse_executor
+        self.columnar = columnar
+
+
+    def pending_stores(self) -> List[str]:
+        """
+        Get the stores still to be crawled in the order they'll be started.
+        Returns:
+            List of store names.
+        """
+        names = [name for name in self.store_names if self.checkpoint is None or not self.checkpoint.is_complete(name)]
+        if self.priority is not None:
+            names.sort(key=self.priority)
+        return names
+
+
+    def __new_store(self, store_name: str) -> Store:
+        """
+        Build a Store that leaves its concurrency to the scheduler.
+        Args:
+            store_name: The name of the store.
+        Returns:
+            The Store.
+        """
+        return Store(store_name, transport=self.transport, parser=self.parser, restrict=self.restrict,
+                     parse_executor=self.parse_executor, columnar=self.columnar)
+
+
+    @staticmethod
+    def __fetch_shop(crawl: _StoreCrawl) -> int:
+        """
+        Fetch a store's shop page.
+        Args:
+            crawl: The store being crawled.
+        Returns:
+            Integer of the store's listing pages, 0 if the shop page couldn't be collected.
+        """
+        crawl.store.connect()
+        if crawl.store.soup is None:
+            return 0
+        return crawl.store.get_page_quantity()
+
+
+    @staticmethod
+    def __fetch_listing_page(crawl: _StoreCrawl, page: int) -> bool:
+        """
+        Fetch one of a store's listing pages into its cache.
+        Args:
+            crawl: The store being crawled.
+            page: The page number.
+        Returns:
+            True if the page was collected.
+        """
+        return crawl.store.load_listing_page(page)
+
+
+    def __finish(self, crawl: _StoreCrawl) -> CrawlResult:
+        """
+        Build a store's result once all of its pages have been fetched, nothing is requested again.
+        Args:
+            crawl: The store being crawled.
+        Returns:
+            CrawlResult of the store.
+        """
+        name = crawl.store.store_name
+        if crawl.failed_pages:
+            pages = ', '.join(str(page) for page in sorted(crawl.failed_pages))
+            return CrawlResult(name, error=f'Listing pages {pages} couldn\'t be collected', pages_fetched=crawl.pages_fetched)
+
+        crawl.store.get_all_data()
+        return CrawlResult(name, snapshot=crawl.store.snapshot(), pages_fetched=crawl.pages_fetched)
+
+
+    def crawl(self) -> Iterator[CrawlResult]:
+        """
+        Crawl every pending store, yielding each one as soon as all of its pages are in.
+        A store is only written to the checkpoint once the caller has taken its result, so a run killed part way
+        through never skips a store whose data wasn't saved.
+        Yields:
+            CrawlResult for every store in completion order.
+        """
+        names = iter(self.pending_stores())
+        ready = [] # heap of (store rank, page, crawl), page 0 is the shop page
+        in_flight = {}
+        rank = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                while len(in_flight) < self.max_workers:
+                    if ready:
+                        _, page, crawl = heapq.heappop(ready)
+                    else:
+                        name = next(names, None)
+                        if name is None:
+                            break
+                        crawl = _StoreCrawl(rank, self.__new_store(name))
+                        page = 0
+                        rank += 1
+
+                    if page == 0:
+                        future = executor.submit(self.__fetch_shop, crawl)
+                    else:
+                        future = executor.submit(self.__fetch_listing_page, crawl, page)
+                    in_flight[future] = (page, crawl)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page, crawl = in_flight.pop(future)
+                    crawl.pages_fetched += 1
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.error('Crawl of %s page %d failed: %s', crawl.store.store_name, page, e)
+                        outcome = 0 if page == 0 else False
+
+                    if page == 0:
+                        if not outcome:
+                            yield CrawlResult(crawl.store.store_name, error='Shop page couldn\'t be collected',
+                                              pages_fetched=crawl.pages_fetched)
+                            continue
+                        crawl.remaining = outcome
+                        for listing_page in range(1, outcome + 1):
+                            heapq.heappush(ready, (crawl.rank, listing_page, crawl))
+                        continue
+
+                    if not outcome:
+                        crawl.failed_pages.append(page)
+                    crawl.remaining -= 1
+                    if crawl.remaining > 0:
+                        continue
+
+                    result = self.__finish(crawl)
+                    yield result
+                    if result.ok and self.checkpoint is not None:
+                        self.checkpoint.mark_complete(result.store_name)
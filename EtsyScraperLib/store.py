@@ -1,99 +1,165 @@
-from bs4 import BeautifulSoup
 import requests
 import re
+import logging
 import json
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from EtsyScraperLib.transport import Transport, get_default_transport
+from EtsyScraperLib.extract import extract_store_fields, extract_listing_page
+from EtsyScraperLib.parsing import LISTING_STRAINER, make_soup
+from EtsyScraperLib.instrumentation import increment, logger, selector_failed, timed
+from EtsyScraperLib.workers import parse_listing_html, resolve_parsing
+from EtsyScraperLib.records import Listing, ListingColumns, StoreSnapshot
+from EtsyScraperLib.prices import PriceColumn
+from EtsyScraperLib.lazy import LazyField, fills
+from EtsyScraperLib.streaming import STORE_FIELD_REGIONS, fetch_partial
+from EtsyScraperLib.incremental import StoreDiff, chunk_fingerprints, diff_listings, find_reusable_tail, listing_key, page_fingerprint
 
 
 class Store:
-    # Store Info
+    # Store Info, each field is extracted the first time it's read unless its getter has been called
     store_name: str = ''
-    store_description: str = ''
-    store_location: str = ''
-    store_logo: str = ''
-    store_banner: str = ''
+    store_description: str = LazyField('get_description', '')
+    store_location: str = LazyField('get_location', '')
+    store_logo: str = LazyField('get_logo', '')
+    store_banner: str = LazyField('get_banner', '')
     store_url: str = ''
-    sales_quantity: int = 0
-    product_quantity: int = 0
-    review_rating: float = 0.0
-    review_quantity: int = 0
-    admirers: int = 0
-    product_titles: List[str] = []
-    product_urls: List[str] = []
-    product_prices: List[str] = []
-    product_details: List[dict] = []
+    sales_quantity: int = LazyField('get_sales_quantity', 0)
+    product_quantity: int = LazyField('get_product_quantity', 0)
+    review_rating: float = LazyField('get_review_rating', 0.0)
+    review_quantity: int = LazyField('get_review_quantity', 0)
+    admirers: int = LazyField('get_admirers', 0)
 
+    # Listing pages are only crawled once the listings are read
+    listings: Union[List[Listing], ListingColumns] = LazyField('parse_product_urls', factory=list)
 
-    def __init__(self, store_name: str):
+
+    def __init__(self, store_name: str, transport: Optional[Transport] = None, max_workers: int = 1,
+                 parser: Optional[str] = None, restrict: Optional[bool] = None, parse_executor: Optional[Executor] = None,
+                 columnar: bool = False):
         """
         Sets up which Etsy store you want to scrape data from.
         Args:
             store_name: The name of the store you would like to extract data from e.g. https://www.etsy.com/shop/AustinAsh34 is AustinAsh34
+            transport: The pooled HTTP transport to issue requests with, defaults to the process-wide transport.
+            max_workers: The number of listing pages fetched concurrently, 1 keeps the crawl sequential. Keep this at or below the transport's pool size.
+            parser: The BeautifulSoup4 backend e.g. 'lxml', defaults to the global parser.
+            restrict: Whether listing pages only build the listing grid, defaults to the global setting.
+            parse_executor: An optional process pool that listing pages are parsed in, so parsing isn't held back by the GIL.
+            columnar: Keep listings in packed columns rather than Listing objects, for very large stores.
         """
         self.store_name = store_name
         self.store_url = f'https://etsy.com/shop/{self.store_name}'
         self.soup = None
-
-
-    def connect(self):
+        self.transport = transport or get_default_transport()
+        self.max_workers = max(1, max_workers)
+        self.parser = parser
+        self.restrict = restrict
+        self.parse_executor = parse_executor
+        self.columnar = columnar
+        self.__listing_pages: Dict[int, List[Listing]] = {}
+        self.__listings_loaded = False
+        self.page_fingerprints: List[str] = []
+        self.__fields = None
+        self.__fields_soup = None
+        self.__page_requested = False
+
+
+    def connect(self, fields: Optional[Iterable[str]] = None):
         """
         Issue a GET request to the Etsy store to retrieve the HTML data.
+        Args:
+            fields: Only download the page until these fields have arrived, any of 'description', 'location', 'logo',
+                'banner', 'sales_quantity', 'product_quantity', 'admirers', 'page_quantity', 'review_rating' and
+                'review_quantity'. Other fields may then be missing. Defaults to the whole page.
         """
         try:
-            request = requests.get(self.store_url)
-            request.raise_for_status()  # checks for non-2xx status codes
-
-            print('[?] Request was successful.')
-            page_html = request.text
-            self.soup = BeautifulSoup(page_html, 'html.parser')
+            if fields is None:
+                request = self.transport.get(self.store_url)
+                request.raise_for_status()  # checks for non-2xx status codes
+                page_html = request.text
+            else:
+                page_html = fetch_partial(self.transport, self.store_url, STORE_FIELD_REGIONS, fields)
+
+            logger.debug('Fetched %s', self.store_url)
+            self.soup = make_soup(page_html, self.parser)
         except requests.exceptions.RequestException as e:
-            print(f'[Request Failed]: {e}')
+            logger.error('Request failed for %s: %s', self.store_url, e)
+            increment('request_failures')
         
 
-    def __find_element(self, type: str, attr: str, content: str, fail_value: str = '') -> str:
+    def ensure_loaded(self, field: Optional[str] = None):
         """
-        Wrapper around the BeautifulSoup4 method 'find()' to carry out exception checks.
+        Fetch the store page if it hasn't been fetched, used before any field is extracted so getters, 'get_all_data()'
+        and lazy reads all work without 'connect()'. Listing pages are fetched by the getter of 'listings' itself.
         Args:
-            type: tag name e.g. span, p, img
-            attr: attribute type e.g class, id
-            content: info relating to the 'attr'
+            field: The field about to be extracted.
+        """
+        if self.soup is None and not self.__page_requested:
+            self.__page_requested = True # a failed request isn't repeated for every field read
+            self.connect()
+
+
+    def __get_fields(self) -> dict:
+        """
+        Get the elements behind every store field, the store page is walked once per connection.
+        Returns:
+            Dictionary of field name to element.
+        """
+        self.ensure_loaded() # every getter extracts through here, so they connect like the lazy fields do
+        if self.__fields is None or self.__fields_soup is not self.soup:
+            with timed('extract', page='store'):
+                self.__fields = extract_store_fields(self.soup)
+            self.__fields_soup = self.soup
+        return self.__fields
+
+
+    def __element_text(self, field: str, fail_value: str = '') -> str:
+        """
+        Get the stripped text of a store field's element and carry out exception checks.
+        Args:
+            field: The field name e.g. description, location
             fail_value: if try fails then mark relevant member as 'fail_val'
         Returns:
             String of the value retrieved from the element.
         """
         try:
-            element = self.soup.find(type, {attr: content})
+            element = self.__get_fields()[field]
             return element.text.strip()
         except AttributeError:
-            print(f'[AttributeError]: {fail_value}')
+            selector_failed(f'store.{field}', fail_value)
             return fail_value
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed(f'store.{field}', f'Couldn\'t read the {field}: {e}', logging.ERROR)
             return fail_value
 
 
+    @fills('store_description')
     def get_description(self) -> str:
         """
         Get the description of the store.
         Returns:
             String of the store description.
         """
-        element = self.__find_element('p', 'class', 'wt-text-caption wt-hide-xs wt-show-lg wt-wrap wt-break-all', 'Description coudn\'t be found.')
+        element = self.__element_text('description', 'Description coudn\'t be found.')
         self.store_description = element
         return self.store_description
 
 
+    @fills('store_location')
     def get_location(self) -> str:
         """
         Get the location of the store.
         Returns:
             String of the store location.
         """
-        element = self.__find_element('span', 'class', 'shop-location', 'Location couldn\'t be found.')
+        element = self.__element_text('location', 'Location couldn\'t be found.')
         self.store_location = element
         return self.store_location
 
 
+    @fills('store_logo')
     def get_logo(self) -> str:
         """
         Get the store logo url.
@@ -101,18 +167,19 @@ class Store:
             String of the URL for the store logo.
         """
         try:
-            logo = self.soup.find('img', {'class': 'shop-icon-external'})
+            logo = self.__get_fields()['logo']
             self.store_logo = logo.get('src')
         except AttributeError:
-            print('Attribute Error: Logo couldn\'t be found.')
+            selector_failed('store.logo', 'Logo couldn\'t be found.')
             self.store_logo = 'Logo couldn\'t be found.'
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.logo', f'Couldn\'t read the logo: {e}', logging.ERROR)
             self.store_logo = 'Logo couldn\'t be found.'
         finally:
             return self.store_logo
 
 
+    @fills('store_banner')
     def get_banner(self) -> str:
         """
         Get the store banner url.
@@ -120,18 +187,19 @@ class Store:
             String of the URL for the store banner.
         """
         try:
-            banner = self.soup.find('img',{'class': 'wt-position-absolute wt-display-block fill-min-height wt-width-full'})
+            banner = self.__get_fields()['banner']
             self.store_banner = banner.get('src')
         except AttributeError:
-            print('[AttributeError]: Banner couldn\'t be found.')
+            selector_failed('store.banner', 'Banner couldn\'t be found.')
             self.store_banner = 'Banner couldn\'t be found.'
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.banner', f'Couldn\'t read the banner: {e}', logging.ERROR)
             self.store_banner = 'Banner couldn\'t be found.'
         finally:
             return self.store_banner
 
 
+    @fills('sales_quantity')
     def get_sales_quantity(self) -> int:
         """
         Extract the amount of sales the store has had.
@@ -139,17 +207,17 @@ class Store:
             Integer of the sales quantity.
         """
         try:
-            review_band = self.soup.find('div', {'class': 'shop-sales-reviews'})
-            span = review_band.find('span', {'class': 'wt-text-caption wt-no-wrap'})
+            span = self.__get_fields()['sales']
             self.sales_quantity = int(span.text.replace(' Sales', '').replace(',',''))
         except AttributeError:
-            print('[AttributeError]: Sales quantity couldn\'t be found.')
+            selector_failed('store.sales_quantity', 'Sales quantity couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.sales_quantity', f'Couldn\'t read the sales quantity: {e}', logging.ERROR)
         finally:
             return self.sales_quantity
 
 
+    @fills('product_quantity')
     def get_product_quantity(self) -> int:
         """
         Extract the amount of products for sale by the store.
@@ -157,15 +225,12 @@ class Store:
             Integer of the product quantity.
         """
         try:
-            side_bar = self.soup.find('div', {'class': 'shop-home-wider-sections'})
-            div = side_bar.find('div', {'class': 'wt-tab-container'})
-            button = div.find('li', {'class': 'wt-tab__item'})
-            span = button.find('span', {'class': 'wt-mr-md-2'})
+            span = self.__get_fields()['product_quantity']
             self.product_quantity = int(span.text)
         except AttributeError:
-            print('[AttributeError]: Product quantity couldn\'t be found.')
+            selector_failed('store.product_quantity', 'Product quantity couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.product_quantity', f'Couldn\'t read the product quantity: {e}', logging.ERROR)
         finally:
             return self.product_quantity
 
@@ -177,23 +242,16 @@ class Store:
             Integer of the number of product pages.
         """
         try:
-            shop_box = self.soup.find('div', {'class': 'shop-home-wider-items'})
-            pagination = shop_box.find('div', {'class': 'wt-show-xl'})
-            if pagination:
-                buttons = pagination.find_all('li', class_='wt-action-group__item-container')
-                if buttons:
-                    return int(len(buttons) - 1)
-                else:
-                    return 0
-            return 0
-        except AttributeError:
-            print('[AttributeError]: Page quantity couldn\'t be found.')
+            buttons = self.__get_fields()['page_buttons']
+            if buttons:
+                return int(len(buttons) - 1)
             return 0
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.page_quantity', f'Couldn\'t read the page quantity: {e}', logging.ERROR)
             return 0
 
 
+    @fills('admirers')
     def get_admirers(self) -> int:
         """
         Get the amount of admirers the store has.
@@ -201,46 +259,67 @@ class Store:
             Integer of admirers.
         """
         try:
-            shop_sidebar = self.soup.find('div', {'class': 'shop-home-wider-sections'})
-            link_section = shop_sidebar.find(lambda tag: tag.name == 'a' and 'favoriters' in tag.get('href', ''))
+            link_section = self.__get_fields()['admirers']
             text = link_section.text
             format_text = text.replace(' Admirers', '').replace(' Admirer', '')
             self.admirers = int(format_text)
         except AttributeError:
-            print('[AttributeError]: Admirers quantity couldn\'t be found.')
+            selector_failed('store.admirers', 'Admirers quantity couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.admirers', f'Couldn\'t read the admirers: {e}', logging.ERROR)
         finally:
             return self.admirers
 
 
+    @property
+    def product_urls(self) -> List[str]:
+        """
+        The URL of each collected product.
+        """
+        return [listing.url for listing in self.listings]
+
+
+    @property
+    def product_titles(self) -> List[str]:
+        """
+        The title of each collected product.
+        """
+        return [listing.title for listing in self.listings]
+
+
+    @property
+    def product_prices(self) -> List[str]:
+        """
+        The price of each collected product.
+        """
+        return [listing.price for listing in self.listings]
+
+
+    @property
+    def product_details(self) -> List[dict]:
+        """
+        Dictionaries of the title, URL and price of each collected product.
+        """
+        return [listing.to_dict() for listing in self.listings]
+
+
+    def price_column(self) -> PriceColumn:
+        """
+        Get every product's price as a currency and an amount in minor units, packed into arrays for bulk statistics.
+        Returns:
+            PriceColumn in the same order as the listings.
+        """
+        self.__ensure_listings()
+        return PriceColumn.from_listings(self.listings)
+
+
     def parse_product_urls(self) -> List[str]:
         """
         Parse every url of each product from the store.
         Returns:
             List of product URLs.
         """
-        base_url = self.store_url + '?page='
-        page_quantity = self.__get_page_quantity()
-        if page_quantity < 1:
-            page_quantity = 1
-
-        for i in range(1, page_quantity + 1):
-            try:
-                request = requests.get(base_url + str(i))
-                request.raise_for_status()
-                html = request.text
-                page_soup = BeautifulSoup(html, 'html.parser')
-                listings = page_soup.find('div', {'class': 'responsive-listing-grid'})
-                listing_links = listings.find_all('a', {'class': 'listing-link'})
-                for product in listing_links:
-                    self.product_urls.append(product['href'])
-
-            except AttributeError:
-                print('[AttributeError]: Product URLs couldn\'t be found.')
-            except Exception as e:
-                print(f'[Error Occurred]: {e}')
-        
+        self.__ensure_listings()
         return self.product_urls
 
 
@@ -250,28 +329,7 @@ class Store:
         Returns:
             List of product titles.
         """
-        base_url = self.store_url + '?page='
-        page_quantity = self.__get_page_quantity()
-        if page_quantity < 1:
-            page_quantity = 1
-
-        for i in range(1, page_quantity + 1):
-            try:
-                request = requests.get(base_url + str(i))
-                request.raise_for_status()
-                html = request.text
-                page_soup = BeautifulSoup(html, 'html.parser')
-                listings = page_soup.find('div', {'class': 'responsive-listing-grid'})
-                listing_titles = listings.find_all('div', {'class': 'v2-listing-card__info'})
-                for product in listing_titles:
-                    title = product.find('h3').text
-                    self.product_titles.append(title.strip())
-
-            except AttributeError:
-                print('[AttributeError]: Product titles couldn\'t be found.')
-            except Exception as e:
-                print(f'[Error Occurred]: {e}')
-        
+        self.__ensure_listings()
         return self.product_titles
 
 
@@ -281,92 +339,288 @@ class Store:
         Returns:
             List of product prices.
         """
-        base_url = self.store_url + '?page='
+        self.__ensure_listings()
+        return self.product_prices
+
+
+    def __parse_listing_page(self, page: int) -> Optional[List[Listing]]:
+        """
+        Fetch and parse a single listing page of the store.
+        Args:
+            page: The page number to collect, starting at 1.
+        Returns:
+            List of the listings found on the page, None if the page couldn't be collected.
+        """
+        try:
+            request = self.transport.get(f'{self.store_url}?page={page}')
+            request.raise_for_status() # exception for non-2xx status
+
+            if self.parse_executor is not None:
+                parser, restrict = resolve_parsing(self.parser, self.restrict)
+                return self.parse_executor.submit(parse_listing_html, request.content, parser, restrict).result()
+
+            html = request.text
+            page_soup = make_soup(html, self.parser, LISTING_STRAINER, self.restrict)
+            with timed('extract', page='listing'):
+                return extract_listing_page(page_soup)
+
+        except requests.exceptions.RequestException as e:
+            logger.error('Request failed for %s page %d: %s', self.store_url, page, e)
+            increment('request_failures')
+        except AttributeError:
+            selector_failed('store.listings', 'Product data couldn\'t be found.')
+        except Exception as e:
+            selector_failed('store.listings', f'Couldn\'t read the listings: {e}', logging.ERROR)
+
+        return None
+
+
+    def __get_listing_page(self, page: int) -> List[Listing]:
+        """
+        Get a listing page from the cache, fetching and parsing it only if it hasn't been collected yet.
+        Args:
+            page: The page number to collect, starting at 1.
+        Returns:
+            List of the listings found on the page.
+        """
+        cached = self.__listing_pages.get(page)
+        if cached is not None:
+            return cached
+
+        result = self.__parse_listing_page(page)
+        if result is None:
+            return [] # failed pages aren't cached so the next call retries them
+
+        self.__listing_pages[page] = result
+        return result
+
+
+    def __load_listing_pages(self) -> List[List[Listing]]:
+        """
+        Collect every listing page of the store, each page is fetched and parsed at most once per Store.
+        When 'max_workers' is above 1 uncached pages are fetched and parsed concurrently, results are still kept in page order.
+        Returns:
+            List of each page's listings in page order.
+        """
         page_quantity = self.__get_page_quantity()
         if page_quantity < 1:
             page_quantity = 1
 
-        for i in range(1, page_quantity + 1):
-            try:
-                request = requests.get(base_url + str(i))
-                request.raise_for_status()
-                html = request.text
-                page_soup = BeautifulSoup(html, 'html.parser')
-                listings = page_soup.find('div', {'class': 'responsive-listing-grid'})
-                listing_prices = listings.find_all('div', {'class': 'n-listing-card__price'})
-                for product in listing_prices:
-                    symbol = product.find('span', {'class': 'currency-symbol'})
-                    price = product.find('span', {'class': 'currency-value'})
-
-                    self.product_prices.append(symbol.text + price.text)
-
-            except AttributeError:
-                print('[AttributeError]: Product prices couldn\'t be found.')
-            except Exception as e:
-                print(f'[Error Occurred]: {e}')
+        pages = range(1, page_quantity + 1)
+        missing = [i for i in pages if i not in self.__listing_pages]
+        workers = min(self.max_workers, len(missing))
 
-        return self.product_prices
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self.__get_listing_page, missing))
 
-    
-    def __parse_product_details(self):
+        return [self.__get_listing_page(i) for i in pages]
+
+
+    def get_page_quantity(self) -> int:
         """
-        Collect all product details from store. This avoids making several rounds of requests to Etsy.
+        Get the amount of listing pages the store has, the store page is fetched first if it hasn't been.
+        Returns:
+            Integer of the number of listing pages, at least 1.
+        """
+        return max(1, self.__get_page_quantity())
+
+
+    def load_listing_page(self, page: int) -> bool:
+        """
+        Fetch and parse a single listing page into the listing page cache, used to spread a store's pages across a crawl.
+        Args:
+            page: The page number to collect, starting at 1.
+        Returns:
+            True if the page is in the cache, False if it couldn't be collected.
+        """
+        self.__get_listing_page(page)
+        return page in self.__listing_pages
+
+
+    def invalidate_listing_pages(self):
+        """
+        Drop every cached listing page so the next parse fetches them from Etsy again.
+        """
+        self.__listing_pages.clear()
+        self.__listings_loaded = False
+
+
+    def refresh_listing_pages(self):
+        """
+        Re-fetch every listing page and rebuild the store's listings.
+        """
+        self.invalidate_listing_pages()
+        self.__parse_product_details()
+
+
+    def iter_products(self) -> Iterator[Listing]:
+        """
+        Stream the store's products one at a time as each listing page is fetched and parsed.
+        New pages aren't kept in the listing page cache, so memory stays flat however big the store is.
+        When 'max_workers' is above 1 up to that many pages are fetched ahead, products are still yielded in page order.
+        Yields:
+            Listing of the product title, URL and price, a listing that appears on more than one page is yielded once.
         """
-        base_url = self.store_url + '?page='
         page_quantity = self.__get_page_quantity()
         if page_quantity < 1:
             page_quantity = 1
-        
-        for i in range(1, page_quantity + 1):
-            try:
-                print(i)
-                request = requests.get(f'{base_url}{i}')
-                request.raise_for_status() # exception for non-2xx status
-
-                html = request.text
-                page_soup = BeautifulSoup(html, 'html.parser')
-
-
-                listings = page_soup.find('div', {'class': 'responsive-listing-grid'})
-                listing_links = listings.find_all('a', {'class': 'listing-link'})
-                self.product_urls.extend(product['href'] for product in listing_links)
-
-                listing_titles = listings.find_all('div', {'class': 'v2-listing-card__info'})
-                self.product_titles.extend(title.find('h3').text.strip() for title in listing_titles)
-
-                listing_prices = listings.find_all('div', {'class': 'n-listing-card__price'})
-                self.product_prices.extend(
-                    symbol.text + price.text for price, symbol in ((product.find('span', {'class': 'currency-value'}), 
-                                                                    product.find('span', {'class': 'currency-symbol'})) 
-                                                                    for product in listing_prices)
-                    )
-
-            except requests.exceptions.RequestException as e:
-                print(f'[Request Failed]: {e}')
-            except AttributeError:
-                print('[AttributeError]: Product data couldn\'t be found.')
-            except Exception as e:
-                print(f'[Error Occurred]: {e}')
-        
-        self.__product_details_to_dict()
 
-    
-    def __product_details_to_dict(self) -> dict:
+        pages = range(1, page_quantity + 1)
+        workers = min(self.max_workers, page_quantity)
+        seen = set()
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for i in pages:
+                    pending.append(executor.submit(self.__stream_listing_page, i))
+                    if len(pending) >= workers:
+                        yield from self.__unseen(pending.popleft().result(), seen)
+                while pending:
+                    yield from self.__unseen(pending.popleft().result(), seen)
+        else:
+            for i in pages:
+                yield from self.__unseen(self.__stream_listing_page(i), seen)
+
+
+    @staticmethod
+    def __unseen(listings: List[Listing], seen: set) -> List[Listing]:
+        """
+        Drop listings already collected from an earlier page, a listing moves pages when the store changes mid-crawl.
+        Args:
+            listings: The listings on a page.
+            seen: The listing IDs collected so far, the page's listings are added to it.
+        Returns:
+            List of the listings not seen before, in page order.
+        """
+        unseen = []
+        for listing in listings:
+            key = listing_key(listing)
+            if key in seen:
+                increment('duplicate_listings')
+                continue
+            seen.add(key)
+            unseen.append(listing)
+        return unseen
+
+
+    def __stream_listing_page(self, page: int) -> List[Listing]:
         """
-        Append dictionaries of product details to a list.
+        Get a listing page from the cache if it's there, otherwise fetch and parse it without caching it.
+        Args:
+            page: The page number to collect, starting at 1.
         Returns:
-            Dictionary of product titles, URLs and price.
+            List of the listings found on the page.
         """
-        for i in range(len(self.product_titles)):
-            data = {}
-            data['produceTitle'] = self.product_titles[i]
-            data['productURL'] = self.product_urls[i]
-            data['productPrice'] = self.product_prices[i]
-            self.product_details.append(data)
+        cached = self.__listing_pages.get(page)
+        if cached is not None:
+            return cached
+        return self.__parse_listing_page(page) or []
 
-        return self.product_details
 
+    def __ensure_listings(self):
+        """
+        Collect the store's listings unless they've already been collected since the cache was last invalidated.
+        """
+        if not self.__listings_loaded:
+            self.__parse_product_details()
 
+
+    def __parse_product_details(self):
+        """
+        Collect all product details from store. This avoids making several rounds of requests to Etsy.
+        """
+        self.listings = ListingColumns() if self.columnar else []
+        self.page_fingerprints = []
+        seen = set()
+        for page in self.__load_listing_pages():
+            self.listings.extend(self.__unseen(page, seen))
+            self.page_fingerprints.append(page_fingerprint(page))
+
+        if self.columnar:
+            self.__listing_pages.clear() # the packed columns replace the cached Listing objects
+        self.__listings_loaded = True
+
+
+    def snapshot(self, include_listings: bool = True) -> StoreSnapshot:
+        """
+        Capture the store's data, any field that hasn't been extracted yet is extracted first.
+        Args:
+            include_listings: Whether to include the listings, which crawls the listing pages if they haven't been.
+        Returns:
+            StoreSnapshot of the store fields and listings.
+        """
+        return StoreSnapshot(
+            self.store_name,
+            store_description=self.store_description,
+            store_location=self.store_location,
+            store_logo=self.store_logo,
+            store_banner=self.store_banner,
+            product_quantity=self.product_quantity,
+            sales_quantity=self.sales_quantity,
+            admirers=self.admirers,
+            review_quantity=self.review_quantity,
+            review_rating=self.review_rating,
+            listings=self.listings if include_listings else [],
+            page_fingerprints=list(self.page_fingerprints) if include_listings else []
+        )
+
+
+    def incremental_update(self, previous: StoreSnapshot) -> StoreDiff:
+        """
+        Re-crawl the store's listings, only fetching the pages that could have changed since a previous snapshot.
+        Pages are fetched in order until one lines up with the previous listings and the totals agree with the
+        product quantity, the rest of the listings are then taken from the previous snapshot. Call 'connect()' first.
+        A title or price change on a listing in the reused tail isn't seen, those listings aren't fetched again.
+        Args:
+            previous: The snapshot from the last crawl of this store.
+        Returns:
+            StoreDiff of the added, removed and changed listings along with the new snapshot.
+        """
+        self.invalidate_listing_pages()
+        self.get_product_quantity()
+        page_quantity = self.__get_page_quantity()
+        if page_quantity < 1:
+            page_quantity = 1
+
+        previous_listings = list(previous.listings)
+        previous_keys = [listing_key(listing) for listing in previous_listings]
+        positions = {}
+        for i, key in enumerate(previous_keys):
+            positions.setdefault(key, i)
+
+        listings = []
+        fingerprints = []
+        seen = set()
+        served = 0
+        pages_fetched = 0
+        for i in range(1, page_quantity + 1):
+            page = self.__get_listing_page(i)
+            pages_fetched += 1
+            served += len(page)
+            # like the full crawl, pages are fingerprinted as served and listings repeated from an earlier page are dropped
+            listings.extend(self.__unseen(page, seen))
+            fingerprints.append(page_fingerprint(page))
+
+            tail_start = find_reusable_tail(page, i, len(listings), previous, previous_keys, positions, self.product_quantity)
+            if tail_start is not None:
+                tail = previous_listings[tail_start:]
+                fingerprints.extend(chunk_fingerprints(tail, served // i))
+                listings.extend(self.__unseen(tail, seen))
+                break
+
+        # only the fetched pages can hold changed listings, the reused tail is copied from the previous snapshot
+        added, removed, changed = diff_listings(previous_listings, listings)
+
+        self.listings = ListingColumns(listings) if self.columnar else listings
+        self.page_fingerprints = fingerprints
+        self.__listings_loaded = True
+
+        return StoreDiff(added, removed, changed, pages_fetched, self.snapshot())
+
+
+    @fills('review_rating')
     def get_review_rating(self) -> float:
         """
         Get the the quantity of stars for the store.
@@ -374,16 +628,17 @@ class Store:
             Float of review rating.
         """
         try:
-            star_span = self.soup.find('span', {'class': 'stars-svg'})
-            self.review_rating = float(star_span.find('input', {'name': 'rating'}).get('value'))
+            rating = self.__get_fields()['rating']
+            self.review_rating = float(rating.get('value'))
         except AttributeError:
-                print('[AttributeError]: Review ratings couldn\'t be found.')
+                selector_failed('store.review_rating', 'Review ratings couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.review_rating', f'Couldn\'t read the review rating: {e}', logging.ERROR)
         finally:
             return self.review_rating
 
 
+    @fills('review_quantity')
     def get_review_quantity(self) -> int:
         """
         Get the quantity of reviews for the store.
@@ -391,16 +646,17 @@ class Store:
             Integer of review quantity.
         """
         try:
-            review_row = self.soup.find('div', {'class': 'reviews-total'})
-            content = review_row.find_all('div', {'class': 'wt-display-inline-block'})
+            content = self.__get_fields()['review_blocks']
+            if content is None:
+                raise AttributeError('reviews-total')
             pattern = r'\((.*?)\)'
             match = re.findall(pattern, str(content))
 
             self.review_quantity = int(match[0])
         except AttributeError:
-                print('[AttributeError]: Review quantity couldn\'t be found.')
+                selector_failed('store.review_quantity', 'Review quantity couldn\'t be found.')
         except Exception as e:
-            print(f'[Error Occurred]: {e}')
+            selector_failed('store.review_quantity', f'Couldn\'t read the review quantity: {e}', logging.ERROR)
         finally:
             return self.review_quantity
 
@@ -409,7 +665,8 @@ class Store:
         """
         Get all data from the store.
         """
-        print("[?] Collecting store data, this may take a few seconds...")
+        logger.info('Collecting store data for %s', self.store_name)
+        self.ensure_loaded()
         self.get_description()
         self.get_location()
         self.get_logo()
@@ -417,7 +674,7 @@ class Store:
         self.get_sales_quantity()
         self.get_product_quantity()
         self.get_admirers()
-        self.__parse_product_details()
+        self.__ensure_listings()
         self.get_review_rating()
         self.get_review_quantity()
 
@@ -428,19 +685,7 @@ class Store:
         Returns:
             JSON formatted store data.
         """
-        store_data = {
-            'storeName': self.store_name,
-            'storeDescription': self.store_description,
-            'storeLocation': self.store_location,
-            'storeLogo': self.store_logo,
-            'storeBannerImage': self.store_banner,
-            'storeProductQuantity': self.product_quantity,
-            'storeSalesQuantity': self.sales_quantity,
-            'storeAdmirers': self.admirers,
-            'storeReviewQuantity': self.review_quantity,
-            'storeReviewRating': self.review_rating,
-            'storeProductDetails': self.product_details
-        }
+        store_data = self.snapshot().to_dict()
 
         json_data = json.dumps(store_data, indent=4)
 
@@ -0,0 +1,150 @@
+import codecs
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional
+from EtsyScraperLib.extract import BANNER_CLASS, DESCRIPTION_CLASS
+from EtsyScraperLib.parsing import RegionStrainer
+from EtsyScraperLib.instrumentation import increment
+
+
+DEFAULT_CHUNK_SIZE = 16 * 1024
+VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'))
+
+# the element each field is read from, a field is found once its element has closed
+STORE_FIELD_REGIONS = {
+    'description': RegionStrainer([('p', 'class', DESCRIPTION_CLASS)]),
+    'location': RegionStrainer([('span', 'class', 'shop-location')]),
+    'logo': RegionStrainer([('img', 'class', 'shop-icon-external')]),
+    'banner': RegionStrainer([('img', 'class', BANNER_CLASS)]),
+    'sales_quantity': RegionStrainer([('div', 'class', 'shop-sales-reviews')]),
+    'product_quantity': RegionStrainer([('div', 'class', 'shop-home-wider-sections')]),
+    'admirers': RegionStrainer([('div', 'class', 'shop-home-wider-sections')]),
+    'page_quantity': RegionStrainer([('div', 'class', 'shop-home-wider-items')]),
+    'review_rating': RegionStrainer([('span', 'class', 'stars-svg')]),
+    'review_quantity': RegionStrainer([('div', 'class', 'reviews-total')])
+}
+
+PRODUCT_FIELD_REGIONS = {
+    'title': RegionStrainer([('title', None, None)]),
+    'price': RegionStrainer([('div', 'data-buy-box-region', 'price')]),
+    'review_quantity': RegionStrainer([('span', 'class', 'wt-badge--statusInformational')]),
+    'description': RegionStrainer([('div', 'id', 'wt-content-toggle-product-details-read-more')]),
+    'media_urls': RegionStrainer([('ul', 'class', 'carousel-pane-list')])
+}
+
+
+class FieldWatcher(HTMLParser):
+    def __init__(self, regions: Dict[str, RegionStrainer], fields: Iterable[str],
+                 on_ld_json: Optional[Callable[[str], Iterable[str]]] = None):
+        """
+        An incremental parser that's fed a page as it downloads and notices when every wanted field has arrived.
+        No tree is built, it only tracks when each field's element opens and closes.
+        Args:
+            regions: The element each field is read from.
+            fields: The fields that are wanted.
+            on_ld_json: Called with the text of each JSON-LD script, returns the fields it holds.
+        """
+        super().__init__(convert_charrefs=False)
+        self.regions = regions
+        self.pending = set(fields)
+        self.on_ld_json = on_ld_json
+        self.__open: List[list] = [] # [field, tag name, nesting depth]
+        self.__opened = set()
+        self.__script: Optional[List[str]] = None
+
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether every wanted field has been found.
+        """
+        return not self.pending
+
+
+    def handle_starttag(self, tag: str, attrs: list):
+        attrs = dict(attrs)
+        for entry in self.__open:
+            if entry[1] == tag:
+                entry[2] += 1
+
+        if tag == 'script' and self.on_ld_json is not None and (attrs.get('type') or '').lower() == 'application/ld+json':
+            self.__script = []
+
+        for field in list(self.pending):
+            if field in self.__opened or not self.regions[field].matches(tag, attrs):
+                continue
+            self.__opened.add(field)
+            if tag in VOID_ELEMENTS:
+                self.pending.discard(field)
+            else:
+                self.__open.append([field, tag, 1])
+
+
+    def handle_endtag(self, tag: str):
+        for entry in list(self.__open):
+            if entry[1] != tag:
+                continue
+            entry[2] -= 1
+            if entry[2] == 0:
+                self.__open.remove(entry)
+                self.pending.discard(entry[0])
+
+        if tag == 'script' and self.__script is not None:
+            self.pending.difference_update(self.on_ld_json(''.join(self.__script)))
+            self.__script = None
+
+
+    def handle_data(self, data: str):
+        if self.__script is not None:
+            self.__script.append(data)
+
+
+def fetch_partial(transport, url: str, regions: Dict[str, RegionStrainer], fields: Iterable[str],
+                  on_ld_json: Optional[Callable[[str], Iterable[str]]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Download a page only as far as it takes to hold every wanted field, the rest is never read.
+    Args:
+        transport: The Transport to issue the request with.
+        url: The page URL.
+        regions: The element each field is read from.
+        fields: The fields that are wanted.
+        on_ld_json: Called with the text of each JSON-LD script, returns the fields it holds.
+        chunk_size: Bytes read from the connection at a time.
+    Returns:
+        String of the start of the page's HTML, the whole page if a field was never found.
+    """
+    fields = set(fields)
+    unknown = fields - set(regions)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    response = transport.get(url, stream=True)
+    try:
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '')
+        encoding = response.encoding if 'charset' in content_type.lower() and response.encoding else 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        watcher = FieldWatcher(regions, fields, on_ld_json)
+
+        parts = []
+        received = 0
+        for chunk in response.iter_content(chunk_size):
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            watcher.feed(text)
+            if watcher.done:
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+
+        increment('stream_bytes', received, url=url)
+        if watcher.done:
+            increment('stream_early_stops', url=url)
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and 'Content-Encoding' not in response.headers:
+                increment('stream_bytes_skipped', max(0, int(length) - received), url=url)
+
+        return ''.join(parts)
+    finally:
+        response.close() # stopping early drops the connection rather than reading the rest into the pool
@@ -0,0 +1,167 @@
+import re
+import json
+import html
+from typing import Iterator, List, Optional, Union
+from EtsyScraperLib.text_format import format_description
+from EtsyScraperLib.prices import CURRENCY_SYMBOLS
+
+
+LD_JSON_PATTERN = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S)
+LD_JSON_BYTES_PATTERN = re.compile(LD_JSON_PATTERN.pattern.encode('ascii'), re.I | re.S)
+
+
+def iter_ld_json(page_html: Union[str, bytes]) -> Iterator[dict]:
+    """
+    Pull every JSON-LD object out of raw page HTML without parsing the page.
+    Args:
+        page_html: The raw HTML of the page.
+    Yields:
+        Dictionary of each JSON-LD object, including those nested in lists and '@graph'
+    """
+    pattern = LD_JSON_BYTES_PATTERN if isinstance(page_html, bytes) else LD_JSON_PATTERN
+    for match in pattern.finditer(page_html):
+        yield from iter_ld_objects(match.group(1))
+
+
+def iter_ld_objects(script: Union[str, bytes]) -> Iterator[dict]:
+    """
+    Decode the contents of one JSON-LD script.
+    Args:
+        script: The text inside the script tag.
+    Yields:
+        Dictionary of each JSON-LD object, including those nested in lists and '@graph', nothing if it isn't valid JSON.
+    """
+    try:
+        data = json.loads(script)
+    except ValueError:
+        return
+
+    pending = [data]
+    while pending:
+        item = pending.pop(0)
+        if isinstance(item, list):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            yield item
+            if isinstance(item.get('@graph'), list):
+                pending.extend(item['@graph'])
+
+
+def is_type(item: dict, type_name: str) -> bool:
+    """
+    Check a JSON-LD object's '@type', which may be a string or a list.
+    Args:
+        item: The JSON-LD object.
+        type_name: The type e.g. 'Product'
+    Returns:
+        True if the object is of the type.
+    """
+    types = item.get('@type')
+    if isinstance(types, list):
+        return type_name in types
+    return types == type_name
+
+
+def format_price(offers: Union[dict, list]) -> Optional[str]:
+    """
+    Format JSON-LD offers the way Etsy shows the price e.g. $19.16, or £24.99+ when variations cost more.
+    Args:
+        offers: The 'offers' of a Product, either an Offer, an AggregateOffer or a list of them.
+    Returns:
+        String of the price, None if no price was found.
+    """
+    if isinstance(offers, list):
+        offers = next((offer for offer in offers if isinstance(offer, dict)), None)
+    if not isinstance(offers, dict):
+        return None
+
+    currency = offers.get('priceCurrency', '')
+    symbol = CURRENCY_SYMBOLS.get(currency, f'{currency} ' if currency else '')
+
+    if offers.get('price') is not None:
+        return f"{symbol}{offers['price']}"
+    if offers.get('lowPrice') is not None:
+        ranged = offers.get('highPrice') is not None and str(offers['highPrice']) != str(offers['lowPrice'])
+        return f"{symbol}{offers['lowPrice']}{'+' if ranged else ''}"
+    return None
+
+
+def media_url(media: Union[dict, str]) -> Optional[str]:
+    """
+    Get the URL of an ImageObject or VideoObject, which may also just be the URL.
+    Args:
+        media: The media entry.
+    Returns:
+        String of the URL, None if there isn't one.
+    """
+    if isinstance(media, str):
+        return media
+    if isinstance(media, dict):
+        return media.get('contentURL') or media.get('contentUrl') or media.get('url')
+    return None
+
+
+def extract_product_ld(page_html: Union[str, bytes]) -> dict:
+    """
+    Read a product page's fields from its embedded JSON-LD, the same values the DOM lookups in Product return.
+    Args:
+        page_html: The raw HTML of the product page.
+    Returns:
+        Dictionary with whichever of 'title', 'price', 'description', 'review_quantity' and 'media_urls' were found.
+    """
+    product = next((item for item in iter_ld_json(page_html) if is_type(item, 'Product')), None)
+    if product is None:
+        return {}
+    return product_ld_fields(product)
+
+
+def script_product_fields(script: str) -> List[str]:
+    """
+    Get which Product fields one JSON-LD script holds, used to stop streaming a page once they've arrived.
+    Args:
+        script: The text inside the script tag.
+    Returns:
+        List of the field names found.
+    """
+    product = next((item for item in iter_ld_objects(script) if is_type(item, 'Product')), None)
+    return list(product_ld_fields(product)) if product is not None else []
+
+
+def product_ld_fields(product: dict) -> dict:
+    """
+    Read the fields Product extracts from a JSON-LD Product object.
+    Args:
+        product: The JSON-LD object with '@type' Product.
+    Returns:
+        Dictionary with whichever of 'title', 'price', 'description', 'review_quantity' and 'media_urls' were found.
+    """
+    fields = {}
+
+    if isinstance(product.get('name'), str) and product['name'].strip():
+        fields['title'] = html.unescape(product['name']).strip()
+
+    price = format_price(product.get('offers'))
+    if price is not None:
+        fields['price'] = price
+
+    if isinstance(product.get('description'), str) and product['description'].strip():
+        fields['description'] = format_description(html.unescape(product['description']))
+
+    rating = product.get('aggregateRating')
+    if isinstance(rating, dict):
+        count = rating.get('reviewCount', rating.get('ratingCount'))
+        try:
+            fields['review_quantity'] = int(count)
+        except (TypeError, ValueError):
+            pass
+
+    media: List[str] = []
+    for key in ('image', 'video'):
+        entries = product.get(key)
+        if not isinstance(entries, list):
+            entries = [entries] if entries else []
+        media.extend(url for url in map(media_url, entries) if url)
+    if media:
+        fields['media_urls'] = media
+
+    return fields
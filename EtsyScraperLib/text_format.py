@@ -1,4 +1,5 @@
 import re
+from EtsyScraperLib.instrumentation import logger
 
 def format_title(title: str) -> str:
     """
@@ -13,7 +14,7 @@ def format_title(title: str) -> str:
 
         return new_string
     else:
-        print("String doesn't need formatting.")
+        logger.debug('Title doesn\'t need formatting.')
         return title
     
 
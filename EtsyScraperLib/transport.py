@@ -0,0 +1,267 @@
+import time
+import threading
+from typing import Dict, Optional, Union, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from EtsyScraperLib.cache import DiskCache
+from EtsyScraperLib.archive import ArchiveMiss, ResponseArchive
+from EtsyScraperLib.ratelimit import THROTTLE_STATUSES, RateLimiter, RetryPolicy, parse_retry_after
+from EtsyScraperLib.instrumentation import increment, logger, observe
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-GB,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+DEFAULT_TIMEOUT = (5.0, 30.0)
+DEFAULT_POOL_SIZE = 10
+
+
+class Transport:
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, headers: Optional[Dict[str, str]] = None,
+                 timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT, cache: Optional[DiskCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None,
+                 archive: Optional[ResponseArchive] = None, replay: bool = False):
+        """
+        Sets up a keep-alive connection pool shared by every Store and Product using it.
+        Args:
+            pool_size: The maximum number of connections kept open per host.
+            headers: Headers sent with every request, these are merged over the default headers.
+            timeout: Seconds to wait for a response, either a single value or a (connect, read) tuple.
+            cache: An optional on-disk response cache, fresh entries are served locally and stale ones are revalidated.
+            rate_limiter: The per-host limiter every request waits on, use 'RateLimiter(rate=0)' to turn limiting off.
+            retry: How throttled, failed and 5xx requests are retried.
+            archive: An optional ResponseArchive every successful response is appended to, streamed responses aren't kept.
+            replay: Answer every request from 'archive' instead of the network, a URL that isn't archived raises ArchiveMiss.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.archive = archive
+        self.replay = replay
+        if replay and archive is None:
+            raise ValueError('Replaying needs an archive.')
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Issue a GET request over the pooled session.
+        Args:
+            url: The URL to request.
+            kwargs: Any extra arguments accepted by 'requests.Session.get()'.
+        Returns:
+            The response from the server.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if self.archive is None:
+            return self.__fetch(url, **kwargs)
+
+        key = requests.Request('GET', url, params=kwargs.get('params')).prepare().url if kwargs.get('params') else url
+        if self.replay:
+            return self.__replayed_response(key)
+
+        response = self.__fetch(url, **kwargs)
+        if response.status_code == 200 and not kwargs.get('stream'):
+            self.archive.record(key, response)
+        return response
+
+
+    def __fetch(self, url: str, **kwargs) -> requests.Response:
+        """
+        Get a response from the cache or the network.
+        Args:
+            url: The URL to request.
+            kwargs: Any extra arguments accepted by 'requests.Session.get()'.
+        Returns:
+            The response from the server or the cache.
+        """
+        if self.cache is None or kwargs.get('params') or kwargs.get('stream'):
+            return self.__send(url, **kwargs)
+
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            increment('cache_hits', url=url)
+            return self.__cached_response(url, entry)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.__send(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            increment('cache_revalidations', url=url)
+            self.cache.touch(url, entry)
+            return self.__cached_response(url, entry)
+
+        increment('cache_misses', url=url)
+
+        if response.status_code == 200:
+            self.cache.set(
+                url,
+                response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                content_type=response.headers.get('Content-Type'),
+                encoding=response.encoding
+            )
+
+        return response
+
+
+    def __send(self, url: str, **kwargs) -> requests.Response:
+        """
+        Issue a request through the rate limiter, retrying throttled, failed and 5xx responses with backoff.
+        Args:
+            url: The URL to request.
+            kwargs: Any extra arguments accepted by 'requests.Session.get()'.
+        Returns:
+            The final response, which may still be an error once the retries run out.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(url)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt)
+                logger.info('Request to %s failed (%s), retrying in %.1fs', url, e, delay)
+            else:
+                self.__record(url, response, time.perf_counter() - start, kwargs.get('stream', False))
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.feedback(url, response.status_code, retry_after)
+                if response.status_code not in self.retry.statuses or attempt >= self.retry.max_retries:
+                    return response
+                delay = self.retry.delay(attempt, retry_after)
+                logger.info('Request to %s returned %d, retrying in %.1fs', url, response.status_code, delay)
+                if response.status_code in THROTTLE_STATUSES:
+                    increment('throttled', url=url)
+                response.close()
+
+            attempt += 1
+            increment('retries', url=url)
+            time.sleep(delay)
+
+
+    def __record(self, url: str, response: requests.Response, seconds: float, stream: bool):
+        """
+        Record the timings and size of a response.
+        'connect' covers DNS, connecting and waiting for the headers, 'download' covers reading the body.
+        Args:
+            url: The URL that was requested.
+            response: The response.
+            seconds: The total time the request took.
+            stream: Whether the body is still to be read by the caller.
+        """
+        headers_seconds = response.elapsed.total_seconds()
+        observe('connect', headers_seconds, url=url)
+        increment('requests', url=url, status=response.status_code)
+        if not stream:
+            observe('download', max(0.0, seconds - headers_seconds), url=url)
+            increment('bytes_fetched', len(response.content), url=url)
+
+
+    def __cached_response(self, url: str, entry: dict) -> requests.Response:
+        """
+        Build a response from a cache entry.
+        Args:
+            url: The URL the entry was stored under.
+            entry: The entry returned by the cache.
+        Returns:
+            A 200 response holding the cached body.
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = entry.get('encoding')
+        response.headers = CaseInsensitiveDict()
+        if entry.get('content_type'):
+            response.headers['Content-Type'] = entry['content_type']
+        response._content = entry['body']
+        response.from_cache = True
+        return response
+
+
+    def __replayed_response(self, url: str) -> requests.Response:
+        """
+        Build a response from the archive without touching the network.
+        Args:
+            url: The URL that was requested.
+        Returns:
+            The archived response, its body can also be read with 'iter_content()' like a streamed response.
+        """
+        entry = self.archive.get(url)
+        if entry is None:
+            increment('archive_misses', url=url)
+            raise ArchiveMiss(f'{url} isn\'t in the archive {self.archive.path}')
+
+        increment('archive_hits', url=url)
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.url = url
+        response.encoding = entry.get('encoding')
+        response.headers = CaseInsensitiveDict()
+        if entry.get('content_type'):
+            response.headers['Content-Type'] = entry['content_type']
+        response._content = entry['body']
+        response._content_consumed = True
+        response.from_archive = True
+        return response
+
+
+    def close(self):
+        """
+        Close every pooled connection.
+        """
+        self.session.close()
+
+
+_default_transport: Optional[Transport] = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """
+    Get the process-wide transport, creating it on first use.
+    Returns:
+        The shared Transport.
+    """
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
+
+
+def set_default_transport(transport: Transport):
+    """
+    Replace the process-wide transport used by Store and Product when none is injected.
+    Args:
+        transport: The Transport to share.
+    """
+    global _default_transport
+    with _default_lock:
+        _default_transport = transport
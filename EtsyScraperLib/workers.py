@@ -0,0 +1,60 @@
+from typing import List, Optional, Tuple, Union
+from EtsyScraperLib.extract import extract_listing_page
+from EtsyScraperLib.parsing import LISTING_STRAINER, make_soup, get_default_parser, get_restricted_parsing
+from EtsyScraperLib.product import Product
+from EtsyScraperLib.records import Listing
+
+
+# These functions run inside process pool workers. They take raw HTML and hand back only small
+# picklable records, the soup never leaves the worker.
+
+
+def resolve_parsing(parser: Optional[str], restrict: Optional[bool]) -> Tuple[str, bool]:
+    """
+    Fill in the global parser settings before work is sent to another process, which won't share them.
+    Args:
+        parser: The parser backend or None for the global default.
+        restrict: Whether parsing is restricted or None for the global default.
+    Returns:
+        Tuple of the parser backend and restrict setting.
+    """
+    return parser or get_default_parser(), get_restricted_parsing() if restrict is None else restrict
+
+
+def parse_listing_html(html: Union[str, bytes], parser: str, restrict: bool) -> List[Listing]:
+    """
+    Parse a listing page and extract its products.
+    Args:
+        html: The raw HTML of the listing page.
+        parser: The parser backend.
+        restrict: Whether to only build the listing grid.
+    Returns:
+        List of the listings found on the page.
+    """
+    return extract_listing_page(make_soup(html, parser, LISTING_STRAINER, restrict))
+
+
+def parse_product_html(html: Union[str, bytes], product_url: str, parser: str, restrict: bool) -> dict:
+    """
+    Parse a product page and extract all of its data.
+    Args:
+        html: The raw HTML of the product page.
+        product_url: The URL of the product.
+        parser: The parser backend.
+        restrict: Whether to only build the parts of the page data is extracted from.
+    Returns:
+        Dictionary of the product title, price, currency, amount, description, review quantity and media URLs.
+    """
+    product = Product(product_url, parser=parser, restrict=restrict)
+    product.load_html(html)
+    product.get_all_data()
+
+    return {
+        'title': product.title,
+        'price': product.price,
+        'currency': product.currency,
+        'amount': product.amount,
+        'description': product.description,
+        'review_quantity': product.review_quantity,
+        'media_urls': product.media_urls
+    }
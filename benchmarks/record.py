@@ -0,0 +1,62 @@
+import os
+import sys
+import argparse
+from typing import List, Optional
+
+from benchmarks.server import FIXTURES_DIR
+
+
+def record(store_name: str, directory: str = FIXTURES_DIR):
+    """
+    Save a live store's shop page, first listing page and first product page as the benchmark fixtures.
+    Args:
+        store_name: The name of the store to record e.g. AustinAsh34
+        directory: The folder the fixtures are written to.
+    """
+    from EtsyScraperLib import Transport
+    from EtsyScraperLib.extract import extract_listing_page
+    from EtsyScraperLib.parsing import make_soup
+
+    transport = Transport()
+    store_url = f'https://etsy.com/shop/{store_name}'
+
+    pages = {}
+    for page, url in (('shop', store_url), ('listing', f'{store_url}?page=1')):
+        response = transport.get(url)
+        response.raise_for_status()
+        pages[page] = response.content
+
+    listings = extract_listing_page(make_soup(pages['listing']))
+    if not listings:
+        raise ValueError(f'No listings were found for {store_name}')
+
+    response = transport.get(listings[0].url)
+    response.raise_for_status()
+    pages['product'] = response.content
+
+    os.makedirs(directory, exist_ok=True)
+    for page, body in pages.items():
+        with open(os.path.join(directory, f'{page}.html'), 'wb') as file:
+            file.write(body)
+        print(f'[Success]: Recorded {page}.html ({len(body)} bytes)')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Record fresh fixtures from the command line.
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+    Returns:
+        Integer exit code.
+    """
+    parser = argparse.ArgumentParser(description='Record live Etsy pages as benchmark fixtures.')
+    parser.add_argument('store_name', help='The store to record e.g. AustinAsh34')
+    parser.add_argument('--directory', default=FIXTURES_DIR, help='The folder the fixtures are written to.')
+    args = parser.parse_args(argv)
+
+    record(args.store_name, args.directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
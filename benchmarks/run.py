@@ -0,0 +1,397 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+from benchmarks.server import StandInServer, load_fixtures
+
+
+STORE_NAME = 'BenchStore'
+
+# metrics where a higher value is better, every other compared metric is better lower
+HIGHER_IS_BETTER = ('pages_per_sec', 'listings_per_sec')
+COMPARED = ('pages_per_sec', 'listings_per_sec', 'cpu_ms_per_page', 'peak_rss_mb')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident memory of this process and any children it has waited on.
+    Returns:
+        Float of megabytes, None where the 'resource' module isn't available.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024 # bytes on macOS, kilobytes elsewhere
+    return peak / scale
+
+
+def cpu_seconds() -> float:
+    """
+    Get the CPU time used by this process and any children it has waited on e.g. a finished process pool.
+    Returns:
+        Float of seconds.
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def make_transport(options: dict):
+    """
+    Build a transport that doesn't rate limit, so the benchmark measures the library rather than the limiter.
+    Args:
+        options: The benchmark options.
+    Returns:
+        The Transport.
+    """
+    from EtsyScraperLib import Transport, RateLimiter, RetryPolicy
+    return Transport(
+        pool_size=max(10, options['workers']),
+        rate_limiter=RateLimiter(rate=0),
+        retry=RetryPolicy(max_retries=options['retries'], backoff=0.01, max_backoff=0.1)
+    )
+
+
+def make_store(options: dict, **kwargs):
+    """
+    Build a Store pointed at the stand-in server.
+    Args:
+        options: The benchmark options.
+        kwargs: Extra arguments for the Store.
+    Returns:
+        The Store.
+    """
+    from EtsyScraperLib import Store
+    store = Store(STORE_NAME, transport=make_transport(options), parser=options['parser'],
+                  restrict=options['restrict'], **kwargs)
+    store.store_url = f"{options['server_url']}/shop/{STORE_NAME}"
+    return store
+
+
+def bench_store_sequential(options: dict) -> int:
+    """
+    Crawl the store page and every listing page one after another.
+    Returns:
+        Integer of the listings collected.
+    """
+    store = make_store(options)
+    store.connect()
+    store.get_all_data()
+    return len(store.listings)
+
+
+def bench_store_concurrent(options: dict) -> int:
+    """
+    Crawl the store with listing pages fetched by 'workers' threads.
+    Returns:
+        Integer of the listings collected.
+    """
+    store = make_store(options, max_workers=options['workers'])
+    store.connect()
+    store.get_all_data()
+    return len(store.listings)
+
+
+def bench_store_stream(options: dict) -> int:
+    """
+    Stream the store's listings with 'workers' pages fetched ahead.
+    Returns:
+        Integer of the listings collected.
+    """
+    store = make_store(options, max_workers=options['workers'])
+    store.connect()
+    return sum(1 for _ in store.iter_products())
+
+
+def bench_store_process(options: dict) -> int:
+    """
+    Crawl the store with listing pages fetched by 'workers' threads and parsed in a process pool.
+    Returns:
+        Integer of the listings collected.
+    """
+    with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+        store = make_store(options, max_workers=options['workers'], parse_executor=executor)
+        store.connect()
+        store.get_all_data()
+    return len(store.listings)
+
+
+def bench_product_sequential(options: dict) -> int:
+    """
+    Scrape every product page one after another.
+    Returns:
+        0, product pages don't hold listings.
+    """
+    from EtsyScraperLib import Product
+    transport = make_transport(options)
+    for url in options['product_urls']:
+        product = Product(url, transport=transport, parser=options['parser'], restrict=options['restrict'])
+        product.connect()
+        product.get_all_data()
+    return 0
+
+
+def bench_product_batch(options: dict) -> int:
+    """
+    Scrape every product page with 'scrape_products()' across 'workers' threads.
+    Returns:
+        0, product pages don't hold listings.
+    """
+    from EtsyScraperLib import scrape_products
+    results = scrape_products(options['product_urls'], max_workers=options['workers'], transport=make_transport(options),
+                              parser=options['parser'], restrict=options['restrict'])
+    for _ in results:
+        pass
+    return 0
+
+
+def bench_product_process(options: dict) -> int:
+    """
+    Scrape every product page with 'scrape_products()', parsing in a process pool.
+    Returns:
+        0, product pages don't hold listings.
+    """
+    from EtsyScraperLib import scrape_products
+    with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+        results = scrape_products(options['product_urls'], max_workers=options['workers'],
+                                  transport=make_transport(options), parser=options['parser'],
+                                  restrict=options['restrict'], parse_executor=executor)
+        for _ in results:
+            pass
+    return 0
+
+
+def bench_parse(page: str) -> Callable[[dict], int]:
+    """
+    Build a benchmark that parses and extracts one fixture over and over without any HTTP.
+    Args:
+        page: The fixture to parse, 'shop', 'listing' or 'product'
+    Returns:
+        The benchmark function.
+    """
+    def bench(options: dict) -> int:
+        from EtsyScraperLib import Product
+        from EtsyScraperLib.extract import extract_listing_page, extract_store_fields
+        from EtsyScraperLib.parsing import LISTING_STRAINER, make_soup
+
+        html = load_fixtures()[page].decode('utf-8')
+        listings = 0
+        for _ in range(options['parse_rounds']):
+            if page == 'shop':
+                extract_store_fields(make_soup(html, options['parser']))
+            elif page == 'listing':
+                listings += len(extract_listing_page(make_soup(html, options['parser'], LISTING_STRAINER, options['restrict'])))
+            else:
+                product = Product('', parser=options['parser'], restrict=options['restrict'])
+                product.load_html(html)
+                product.get_all_data()
+        return listings
+
+    return bench
+
+
+SCENARIOS: Dict[str, Callable[[dict], int]] = {
+    'parse-shop': bench_parse('shop'),
+    'parse-listing': bench_parse('listing'),
+    'parse-product': bench_parse('product'),
+    'store-sequential': bench_store_sequential,
+    'store-concurrent': bench_store_concurrent,
+    'store-stream': bench_store_stream,
+    'store-process': bench_store_process,
+    'product-sequential': bench_product_sequential,
+    'product-batch': bench_product_batch,
+    'product-process': bench_product_process
+}
+
+
+def run_scenario(name: str, options: dict) -> dict:
+    """
+    Run one scenario and measure it, this is called in a fresh process so peak memory belongs to the scenario alone.
+    Args:
+        name: The scenario to run.
+        options: The benchmark options.
+    Returns:
+        Dictionary of the scenario's measurements.
+    """
+    import logging
+    from EtsyScraperLib import metrics
+
+    logging.getLogger('EtsyScraperLib').setLevel(logging.CRITICAL) # injected errors would otherwise flood the output
+    metrics.reset()
+
+    cpu_start = cpu_seconds()
+    start = time.perf_counter()
+    listings = SCENARIOS[name](options)
+    seconds = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_start
+
+    snapshot = metrics.snapshot()
+    counters = snapshot['counters']
+    parse = snapshot['timings'].get('parse', {})
+    pages = options['parse_rounds'] if name.startswith('parse-') else counters.get('requests', 0)
+
+    return {
+        'scenario': name,
+        'pages': pages,
+        'listings': listings,
+        'seconds': seconds,
+        'pages_per_sec': pages / seconds if seconds else 0.0,
+        'listings_per_sec': listings / seconds if seconds else 0.0,
+        'cpu_seconds': cpu,
+        'cpu_ms_per_page': cpu * 1000 / pages if pages else 0.0,
+        'parse_ms': parse.get('mean', 0.0) * 1000, # wall time per parse, 0 when parsing ran in a process pool
+        'retries': counters.get('retries', 0),
+        'failures': counters.get('request_failures', 0),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run(scenarios: List[str], options: dict, repeat: int = 1) -> List[dict]:
+    """
+    Run each scenario in its own process, keeping the fastest of 'repeat' runs.
+    Args:
+        scenarios: The scenarios to run.
+        options: The benchmark options.
+        repeat: How many times each scenario is run.
+    Returns:
+        List of each scenario's measurements.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for name in scenarios:
+        best = None
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_scenario, name, options).result()
+            if best is None or result['seconds'] < best['seconds']:
+                best = result
+        results.append(best)
+        print_result(best)
+    return results
+
+
+def print_header():
+    """
+    Print the column names of the results table.
+    """
+    print(f"{'scenario':<20}{'pages':>7}{'listings':>10}{'secs':>9}{'pages/s':>10}{'listings/s':>12}"
+          f"{'cpu ms/page':>13}{'parse ms':>10}{'retries':>9}{'peak MB':>9}")
+
+
+def print_result(result: dict):
+    """
+    Print one row of the results table.
+    Args:
+        result: A scenario's measurements.
+    """
+    rss = result['peak_rss_mb']
+    print(f"{result['scenario']:<20}{result['pages']:>7}{result['listings']:>10}{result['seconds']:>9.3f}"
+          f"{result['pages_per_sec']:>10.1f}{result['listings_per_sec']:>12.1f}{result['cpu_ms_per_page']:>13.2f}"
+          f"{result['parse_ms']:>10.2f}{result['retries']:>9}{(f'{rss:.1f}' if rss is not None else '-'):>9}")
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """
+    Find the measurements that got worse than a previous run by more than the tolerance.
+    Args:
+        results: This run's measurements.
+        baseline: A previous run's measurements, as saved with '--json'
+        tolerance: The fraction a measurement may worsen by e.g. 0.1 for 10%
+    Returns:
+        List of regression descriptions, empty if there are none.
+    """
+    previous = {result['scenario']: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result['scenario'])
+        if before is None:
+            continue
+        for key in COMPARED:
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if key in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{result['scenario']} {key}: {old:.2f} -> {new:.2f} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Serve the fixtures locally, run the chosen scenarios and report the results.
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+    Returns:
+        Integer exit code, 1 if a regression was found against '--compare'
+    """
+    parser = argparse.ArgumentParser(description='Benchmark EtsyScraperLib against recorded pages served locally.')
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run, defaults to all of them: {', '.join(SCENARIOS)}")
+    parser.add_argument('--workers', type=int, default=8, help='Workers used by the concurrent scenarios.')
+    parser.add_argument('--products', type=int, default=36, help='Product pages fetched by the product scenarios.')
+    parser.add_argument('--parse-rounds', type=int, default=20, help='Times each fixture is parsed by the parse scenarios.')
+    parser.add_argument('--parser', default=None, help="BeautifulSoup4 backend e.g. 'lxml', defaults to the library default.")
+    parser.add_argument('--restrict', action='store_true', help='Only build the regions of each page data is read from.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the server delays each response by.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay of up to this many seconds.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error.')
+    parser.add_argument('--error-status', type=int, default=503, help='Status code injected errors use.')
+    parser.add_argument('--retries', type=int, default=4, help='Retries per request.')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario, the fastest is reported.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the jitter and error injection.')
+    parser.add_argument('--json', dest='json_path', help='Save the results to this file.')
+    parser.add_argument('--compare', dest='baseline_path', help='Compare against results saved with --json.')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Fraction a measurement may worsen by before it counts as a regression.')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    from EtsyScraperLib.extract import extract_listing_page
+    from EtsyScraperLib.parsing import make_soup
+
+    with StandInServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                       error_status=args.error_status, seed=args.seed) as server:
+        listing_urls = [listing.url for listing in extract_listing_page(make_soup(server.fixtures['listing']))]
+        product_urls = [server.product_url(listing_urls[i % len(listing_urls)]) for i in range(args.products)]
+
+        options = {
+            'server_url': server.url,
+            'product_urls': product_urls,
+            'workers': max(1, args.workers),
+            'parse_rounds': max(1, args.parse_rounds),
+            'parser': args.parser,
+            'restrict': args.restrict,
+            'retries': args.retries
+        }
+
+        print_header()
+        results = run(args.scenarios or list(SCENARIOS), options, max(1, args.repeat))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline_path:
+        with open(args.baseline_path) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'[Regression]: {regression}')
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
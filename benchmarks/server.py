@@ -0,0 +1,212 @@
+import os
+import re
+import time
+import hashlib
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# the listing IDs in the listing page fixture, 1000000000 to 1000000999
+FIXTURE_LISTING_ID = re.compile(rb'(/listing/|data-listing-id=")1000000(\d{3})')
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, bytes]:
+    """
+    Read the recorded pages the stand-in server replays.
+    Args:
+        directory: The folder holding 'shop.html', 'listing.html' and 'product.html'
+    Returns:
+        Dictionary of page type ('shop', 'listing', 'product') to the page bytes.
+    """
+    fixtures = {}
+    for page in ('shop', 'listing', 'product'):
+        with open(os.path.join(directory, f'{page}.html'), 'rb') as file:
+            fixtures[page] = file.read()
+    return fixtures
+
+
+class StandInServer:
+    def __init__(self, fixtures: Optional[Dict[str, bytes]] = None, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: Optional[int] = None):
+        """
+        A local HTTP server that answers like Etsy using recorded pages, so crawls can be timed without the network.
+        '/shop/<name>' serves the shop page, '/shop/<name>?page=N' a listing page and '/listing/...' a product page.
+        Every page carries an 'ETag' and a matching 'If-None-Match' is answered with 304, so revalidation can be exercised.
+        Args:
+            fixtures: The recorded pages, defaults to the ones in 'benchmarks/fixtures'
+            latency: Seconds every response is delayed by, to stand in for the round trip to Etsy.
+            jitter: Extra random delay of up to this many seconds.
+            error_rate: The fraction of requests answered with 'error_status' instead of the page.
+            error_status: The status code injected errors are answered with e.g. 429, 503
+            seed: Seed for the jitter and error injection so runs are repeatable.
+        """
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__listing_pages: Dict[str, bytes] = {}
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), self.__handler())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the server e.g. http://127.0.0.1:53211
+        """
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    def store_url(self, store_name: str) -> str:
+        """
+        Get the URL a Store should be pointed at.
+        Args:
+            store_name: The name of the store.
+        Returns:
+            String of the store's URL on the server.
+        """
+        return f'{self.url}/shop/{store_name}'
+
+
+    def product_url(self, product_url: str) -> str:
+        """
+        Rewrite an Etsy product URL to point at the server.
+        Args:
+            product_url: A product URL e.g. taken from the listing page fixture.
+        Returns:
+            String of the product's URL on the server.
+        """
+        parts = urlsplit(product_url)
+        return f'{self.url}{parts.path}'
+
+
+    def __route(self, path: str) -> Optional[bytes]:
+        """
+        Pick the fixture a request path is answered with.
+        Args:
+            path: The request path including the query string.
+        Returns:
+            The page bytes, None if nothing matches.
+        """
+        parts = urlsplit(path)
+        if '/listing/' in parts.path:
+            return self.fixtures['product']
+        if parts.path.startswith('/shop/'):
+            page = parse_qs(parts.query).get('page')
+            return self.__listing_page(page[0]) if page else self.fixtures['shop']
+        return None
+
+
+    def __listing_page(self, page: str) -> bytes:
+        """
+        Get a listing page, every page has its own listing IDs like a real store so pages aren't duplicates of each other.
+        Args:
+            page: The page number from the query string.
+        Returns:
+            The page bytes.
+        """
+        with self.__lock:
+            body = self.__listing_pages.get(page)
+        if body is None:
+            prefix = f'{1000000 + int(page) if page.isdigit() else 1000000:07d}'.encode('ascii')
+            body = FIXTURE_LISTING_ID.sub(lambda match: match.group(1) + prefix + match.group(2), self.fixtures['listing'])
+            with self.__lock:
+                self.__listing_pages[page] = body
+        return body
+
+
+    def __outcome(self) -> tuple:
+        """
+        Decide how long to delay a request and whether it fails.
+        Returns:
+            Tuple of (delay seconds, whether to inject an error).
+        """
+        with self.__lock:
+            self.requests += 1
+            delay = self.latency + (self.__random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self.__random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, fail
+
+
+    def __handler(self):
+        """
+        Build the request handler class bound to this server's settings.
+        """
+        server = self
+        outcome = self.__outcome
+        route = self.__route
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, like Etsy
+
+            def do_GET(self):
+                delay, fail = outcome()
+                if delay:
+                    time.sleep(delay)
+
+                body = route(self.path)
+                status = 200
+                etag = None
+                if fail:
+                    status, body = server.error_status, b''
+                elif body is None:
+                    status, body = 404, b''
+                else:
+                    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        status, body = 304, b''
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                if fail and status in (429, 503):
+                    self.send_header('Retry-After', '0')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+    def start(self) -> 'StandInServer':
+        """
+        Start serving on a background thread.
+        Returns:
+            The server, so it can be started inline.
+        """
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+
+    def stop(self):
+        """
+        Stop serving and release the port.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -20,8 +20,9 @@ setup(
     description=DESCRIPTION,
     long_description_content_type="text/markdown",
     long_description=LONG_DESCRIPTION,
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
     install_requires=['beautifulsoup4', 'requests'],
+    extras_require={'fast': ['lxml'], 'analytics': ['numpy']},
     keywords=['etsy', 'scraper', 'data', 'store', 'shop', 'price'],
     license='MIT',
     classifiers=CLASSIFIERS
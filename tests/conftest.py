@@ -0,0 +1,74 @@
+import pytest
+from benchmarks.server import StandInServer
+from EtsyScraperLib import Store, Transport, RateLimiter, RetryPolicy, metrics
+
+
+class StandInTransport(Transport):
+    def __init__(self, server: StandInServer, **kwargs):
+        """
+        A transport that sends Etsy product URLs to the stand-in server, so listings collected from a store can be scraped.
+        Args:
+            server: The running StandInServer.
+            kwargs: Any other Transport arguments.
+        """
+        kwargs.setdefault('pool_size', 20)
+        kwargs.setdefault('rate_limiter', RateLimiter(rate=0))
+        kwargs.setdefault('retry', RetryPolicy(max_retries=0))
+        super().__init__(**kwargs)
+        self.server = server
+
+
+    def get(self, url: str, **kwargs):
+        if '/listing/' in url and not url.startswith(self.server.url):
+            url = self.server.product_url(url)
+        return super().get(url, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_transport(server):
+    transports = []
+
+    def make(**kwargs) -> StandInTransport:
+        transport = StandInTransport(server, **kwargs)
+        transports.append(transport)
+        return transport
+
+    yield make
+    for transport in transports:
+        transport.close()
+
+
+@pytest.fixture
+def transport(make_transport):
+    return make_transport()
+
+
+@pytest.fixture
+def make_store(server, transport):
+    def make(store_name: str = 'TestStore', **kwargs) -> Store:
+        kwargs.setdefault('transport', transport)
+        store = Store(store_name, **kwargs)
+        store.store_url = server.store_url(store_name)
+        return store
+
+    return make
+
+
+def counter(name: str) -> int:
+    """
+    Read a metrics counter, 0 if it was never incremented.
+    """
+    return metrics.snapshot()['counters'].get(name, 0)
@@ -0,0 +1,110 @@
+import os
+import pytest
+from EtsyScraperLib import ArchiveMiss, ResponseArchive, Store, replay_products
+from EtsyScraperLib.archive import INDEX_SUFFIX
+from tests.conftest import StandInTransport
+
+
+PAGES = {f'https://www.etsy.com/listing/{i}/item': f'<html>page {i}</html>'.encode('utf-8') * 50 for i in range(3)}
+
+
+def write_pages(path: str, compress_level: int = 6):
+    with ResponseArchive(path, compress_level=compress_level) as archive:
+        for url, body in PAGES.items():
+            archive.add(url, body, content_type='text/html; charset=utf-8', encoding='utf-8')
+
+
+@pytest.mark.parametrize('compress_level', [0, 6])
+def test_records_are_read_back(tmp_path, compress_level):
+    path = str(tmp_path / 'pages.esa')
+    write_pages(path, compress_level)
+
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 3
+        for url, body in PAGES.items():
+            entry = archive.get(url)
+            assert entry['body'] == body
+            assert entry['status'] == 200
+            assert entry['content_type'] == 'text/html; charset=utf-8'
+        assert [entry['url'] for entry in archive.iter_records()] == list(PAGES)
+        assert archive.get('https://www.etsy.com/listing/9/missing') is None
+
+
+def test_later_record_replaces_an_earlier_one(tmp_path):
+    path = str(tmp_path / 'pages.esa')
+    url = next(iter(PAGES))
+    with ResponseArchive(path) as archive:
+        archive.add(url, b'old')
+        archive.add(url, b'new')
+        assert archive.get(url)['body'] == b'new'
+
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 1
+        assert archive.get(url)['body'] == b'new'
+
+
+def test_recovers_after_a_record_cut_short(tmp_path):
+    path = str(tmp_path / 'pages.esa')
+    write_pages(path)
+    urls = list(PAGES)
+
+    # the process was killed after the second record reached the index, while the fourth record was being written
+    with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    with open(path + INDEX_SUFFIX, 'w', encoding='utf-8') as file:
+        file.writelines(lines[:2])
+        file.write(lines[2][:5]) # a line cut short
+    complete_size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        first_record = file.read(int(lines[0].split('\t')[1]))
+    with open(path, 'ab') as file:
+        file.write(first_record[:len(first_record) // 2])
+
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 3 # the third record is found by reading on from the index
+        for url in urls:
+            assert archive.get(url)['body'] == PAGES[url]
+        # the partial record is dropped, so the next one starts where the last complete record ended
+        assert archive.add('https://www.etsy.com/listing/3/item', b'after the crash') == complete_size
+
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 4
+        assert archive.get('https://www.etsy.com/listing/3/item')['body'] == b'after the crash'
+        assert [entry['url'] for entry in archive.iter_records()] == urls + ['https://www.etsy.com/listing/3/item']
+
+
+def test_crawl_is_replayed_without_the_network(server, make_store, tmp_path):
+    path = str(tmp_path / 'crawl.esa')
+    archive = ResponseArchive(path)
+    store = make_store(transport=StandInTransport(server, archive=archive))
+    store.connect()
+    store.get_all_data()
+    recorded = server.requests
+    archive.close()
+
+    with ResponseArchive(path) as archive:
+        transport = StandInTransport(server, archive=archive, replay=True)
+        replayed = Store(store.store_name, transport=transport)
+        replayed.store_url = store.store_url
+        replayed.connect()
+        replayed.get_all_data()
+        with pytest.raises(ArchiveMiss):
+            transport.get(server.store_url('SomewhereElse'))
+        transport.close()
+
+    assert server.requests == recorded
+    assert replayed.snapshot().to_dict() == store.snapshot().to_dict()
+
+
+def test_product_pages_are_extracted_again(server, transport, make_store, tmp_path):
+    path = str(tmp_path / 'products.esa')
+    urls = [server.product_url(url) for url in make_store().parse_product_urls()[:3]]
+    with ResponseArchive(path) as archive:
+        for url in urls:
+            archive.record(url, transport.get(url))
+
+    with ResponseArchive(path) as archive:
+        results = list(replay_products(archive))
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.ok and result.product.title for result in results)
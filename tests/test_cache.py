@@ -0,0 +1,89 @@
+import os
+import time
+import hashlib
+from EtsyScraperLib import DiskCache
+from EtsyScraperLib.cache import CACHE_SUFFIX, EVICT_TO
+from tests.conftest import counter
+
+
+def test_fresh_entry_is_served_without_a_request(server, make_transport, tmp_path):
+    transport = make_transport(cache=DiskCache(str(tmp_path), ttl=60))
+    url = server.store_url('CacheStore')
+
+    first = transport.get(url)
+    second = transport.get(url)
+
+    assert server.requests == 1
+    assert second.from_cache
+    assert second.content == first.content
+    assert counter('cache_hits') == 1
+
+
+def test_stale_entry_is_revalidated_with_a_304(server, make_transport, tmp_path):
+    transport = make_transport(cache=DiskCache(str(tmp_path), ttl=0))
+    url = server.store_url('CacheStore')
+
+    first = transport.get(url)
+    second = transport.get(url)
+
+    assert server.requests == 2
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.content == first.content
+    assert counter('cache_revalidations') == 1
+
+
+def test_changed_page_replaces_a_stale_entry(server, make_transport, tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0)
+    transport = make_transport(cache=cache)
+    url = server.store_url('CacheStore')
+    transport.get(url)
+
+    server.fixtures['shop'] = b'<html><title>Changed</title></html>'
+    response = transport.get(url)
+
+    assert not getattr(response, 'from_cache', False)
+    assert response.content == b'<html><title>Changed</title></html>'
+    assert cache.get(url)['body'] == b'<html><title>Changed</title></html>'
+
+
+def test_revalidation_restarts_the_ttl(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set('https://etsy.com/shop/A', b'page', etag='"1"')
+    entry = cache.get('https://etsy.com/shop/A')
+    entry['stored_at'] -= 120
+    assert not cache.is_fresh(entry)
+
+    cache.touch('https://etsy.com/shop/A', entry)
+
+    refreshed = cache.get('https://etsy.com/shop/A')
+    assert cache.is_fresh(refreshed)
+    assert refreshed['body'] == b'page'
+    assert refreshed['etag'] == '"1"'
+
+
+def entry_path(directory, url: str) -> str:
+    return os.path.join(str(directory), hashlib.sha256(url.encode('utf-8')).hexdigest() + CACHE_SUFFIX)
+
+
+def test_eviction_drops_least_recently_used_down_to_the_low_water_mark(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=10000, compress_level=0)
+    body = os.urandom(1500)
+    urls = [f'https://etsy.com/shop/{i}' for i in range(6)]
+    for url in urls:
+        cache.set(url, body)
+
+    # oldest first, apart from the first URL which was used most recently
+    now = time.time()
+    for i, url in enumerate(urls):
+        os.utime(entry_path(tmp_path, url), (now - 100 + i, now - 100 + i))
+    os.utime(entry_path(tmp_path, urls[0]), (now, now))
+
+    cache.set('https://etsy.com/shop/new', body)
+
+    stored = sum(os.path.getsize(os.path.join(str(tmp_path), name)) for name in os.listdir(str(tmp_path)))
+    assert stored <= cache.max_size * EVICT_TO
+    assert not os.path.exists(entry_path(tmp_path, urls[1]))
+    assert not os.path.exists(entry_path(tmp_path, urls[2]))
+    assert os.path.exists(entry_path(tmp_path, urls[0]))
+    assert os.path.exists(entry_path(tmp_path, 'https://etsy.com/shop/new'))
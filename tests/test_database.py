@@ -0,0 +1,100 @@
+import sqlite3
+from EtsyScraperLib import Listing, ResultDatabase, StoreSnapshot, scrape_products
+from EtsyScraperLib.database import SCHEMA
+
+
+def listing(listing_id: int, price: str = '$1.00') -> Listing:
+    return Listing(f'Item {listing_id}', f'https://www.etsy.com/uk/listing/{listing_id}/item', price)
+
+
+def test_store_round_trip(make_store):
+    store = make_store()
+    store.connect()
+    store.get_all_data()
+    saved = store.snapshot()
+
+    with ResultDatabase(':memory:') as db:
+        db.add_store(store)
+        loaded = db.latest_snapshot(store.store_name)
+
+    assert loaded.to_dict() == saved.to_dict()
+    assert list(loaded.listings) == list(saved.listings)
+    assert loaded.page_fingerprints == saved.page_fingerprints
+    assert [listing.amount for listing in loaded.listings] == [listing.amount for listing in saved.listings]
+
+
+def test_latest_snapshot_feeds_incremental_update(make_store):
+    store = make_store()
+    store.connect()
+    store.get_all_data()
+
+    with ResultDatabase(':memory:') as db:
+        db.add_store(store)
+        previous = db.latest_snapshot(store.store_name)
+
+    again = make_store()
+    again.connect()
+    diff = again.incremental_update(previous)
+    assert diff.pages_fetched == 1
+    assert diff.unchanged
+
+
+def test_snapshots_saved_at_the_same_time_keep_their_own_listings():
+    with ResultDatabase(':memory:') as db:
+        db.add_store(StoreSnapshot('A', listings=[listing(1), listing(2)]), scraped_at=100)
+        db.add_store(StoreSnapshot('A', listings=[listing(3)]), scraped_at=100)
+        assert db.latest_snapshot('A').listings == [listing(3)]
+
+
+def test_streamed_listings_belong_to_their_snapshot():
+    with ResultDatabase(':memory:') as db:
+        snapshot_id = db.add_store(StoreSnapshot('A'), scraped_at=100, include_listings=False)
+        db.add_listings('A', [listing(1), listing(2)], scraped_at=101, snapshot_id=snapshot_id)
+        db.add_listings('A', [listing(3)], scraped_at=102, snapshot_id=snapshot_id)
+        db.add_listings('A', [listing(4)], scraped_at=103)
+
+        assert db.latest_snapshot('A').listings == [listing(1), listing(2), listing(3)]
+        assert db.price_history('4') == [(103.0, '$1.00')]
+
+
+def test_price_and_quantity_history():
+    with ResultDatabase(':memory:') as db:
+        db.add_store(StoreSnapshot('A', product_quantity=2, listings=[listing(1, '$5.00')]), scraped_at=100)
+        db.add_store(StoreSnapshot('A', product_quantity=2, listings=[listing(1, '$5.00')]), scraped_at=200)
+        db.add_store(StoreSnapshot('A', product_quantity=3, listings=[listing(1, '$4.00')]), scraped_at=300)
+
+        assert db.price_history('1') == [(100.0, '$5.00'), (200.0, '$5.00'), (300.0, '$4.00')]
+        assert db.price_changes('1') == [(100.0, '$5.00'), (300.0, '$4.00')]
+        assert db.quantity_changes() == [('A', 300.0, 2, 3)]
+        assert db.quantity_changes(since=301) == []
+        assert db.latest_snapshot('B') is None
+
+
+def test_products_are_saved_in_batches(server, transport, make_store):
+    store = make_store()
+    urls = [server.product_url(url) for url in store.parse_product_urls()[:5]]
+
+    with ResultDatabase(':memory:', batch_size=2) as db:
+        assert db.add_products(scrape_products(urls, max_workers=4, transport=transport), scraped_at=100) == 5
+        rows = db.connection.execute('SELECT listing_id, title FROM products ORDER BY listing_id').fetchall()
+
+    assert [listing_id for listing_id, _ in rows] == sorted(url.split('/listing/')[1].split('/')[0] for url in urls)
+    assert all(title for _, title in rows)
+
+
+def test_older_databases_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA.replace('    snapshot_id INTEGER REFERENCES store_snapshots(id),\n', ''))
+    connection.execute("INSERT INTO store_snapshots (store_name, scraped_at) VALUES ('A', 100)")
+    connection.execute(
+        "INSERT INTO listings (listing_id, store_name, scraped_at, position, title, url, price) "
+        "VALUES ('7', 'A', 100, 0, 'Item 7', 'https://www.etsy.com/uk/listing/7/item', '$1.00')"
+    )
+    connection.commit()
+    connection.close()
+
+    with ResultDatabase(path) as db:
+        assert db.latest_snapshot('A').listings == [listing(7)]
+    with ResultDatabase(path) as db: # opening it again leaves it as it is
+        assert db.latest_snapshot('A').listings == [listing(7)]
@@ -0,0 +1,87 @@
+from benchmarks.server import StandInServer
+from EtsyScraperLib import Listing, StoreSnapshot
+from EtsyScraperLib.incremental import chunk_fingerprints, listing_key
+
+
+def full_crawl(make_store) -> StoreSnapshot:
+    store = make_store()
+    store.connect()
+    store.get_all_data()
+    return store.snapshot()
+
+
+def recrawl(make_store, previous: StoreSnapshot):
+    store = make_store()
+    store.connect()
+    return store, store.incremental_update(previous)
+
+
+def page_size(snapshot: StoreSnapshot) -> int:
+    return len(snapshot.listings) // len(snapshot.page_fingerprints)
+
+
+def test_unchanged_store_only_fetches_the_first_page(make_store):
+    previous = full_crawl(make_store)
+
+    store, diff = recrawl(make_store, previous)
+
+    assert diff.pages_fetched == 1
+    assert diff.unchanged
+    assert list(store.listings) == list(previous.listings)
+    assert store.page_fingerprints == previous.page_fingerprints
+
+
+def test_price_change_on_a_fetched_page_is_reported(make_store):
+    previous = full_crawl(make_store)
+    listings = list(previous.listings)
+    old = listings[3]
+    listings[3] = Listing(old.title, old.url, '$0.01')
+    previous.listings = listings
+
+    _, diff = recrawl(make_store, previous)
+
+    assert diff.pages_fetched == 1
+    assert [(before.price, after.price) for before, after in diff.changed] == [('$0.01', old.price)]
+    assert not diff.added and not diff.removed
+
+
+def test_new_listing_is_added_and_the_tail_reused(make_store):
+    current = full_crawl(make_store)
+    listings = list(current.listings)
+    previous = StoreSnapshot(current.store_name, product_quantity=current.product_quantity - 1, listings=listings[1:],
+                             page_fingerprints=chunk_fingerprints(listings[1:], page_size(current)))
+
+    store, diff = recrawl(make_store, previous)
+
+    assert diff.pages_fetched == 2
+    assert diff.added == [listings[0]]
+    assert not diff.removed and not diff.changed
+    assert list(store.listings) == listings
+
+
+def test_removed_listing_is_reported(make_store):
+    current = full_crawl(make_store)
+    listings = list(current.listings)
+    gone = Listing('Sold out', 'https://www.etsy.com/uk/listing/1999999999/sold-out', '$5.00')
+    previous = StoreSnapshot(current.store_name, product_quantity=current.product_quantity + 1, listings=[gone] + listings,
+                             page_fingerprints=chunk_fingerprints([gone] + listings, page_size(current)))
+
+    store, diff = recrawl(make_store, previous)
+
+    assert diff.pages_fetched == 1
+    assert diff.removed == [gone]
+    assert not diff.added and not diff.changed
+    assert list(store.listings) == listings
+
+
+def test_repeated_pages_are_deduplicated_like_the_full_crawl(make_store, monkeypatch):
+    # every listing page serves the same listings, as Etsy does past the last real page
+    monkeypatch.setattr(StandInServer, '_StandInServer__listing_page', lambda self, page: self.fixtures['listing'])
+    previous = full_crawl(make_store)
+    keys = [listing_key(listing) for listing in previous.listings]
+    assert len(keys) == len(set(keys))
+
+    store, diff = recrawl(make_store, previous)
+
+    assert diff.unchanged
+    assert list(store.listings) == list(previous.listings)
@@ -0,0 +1,72 @@
+import itertools
+import pytest
+from EtsyScraperLib import ListingIndex, scrape_products, scrape_store_products
+
+
+LISTING = 'https://www.etsy.com/uk/listing/1573434449/item-title-1'
+
+
+def test_claim_complete_and_release():
+    index = ListingIndex()
+
+    assert index.claim(LISTING)
+    assert not index.claim(LISTING + '?ref=shop_home_active_3') # the same listing ID
+    index.release(LISTING)
+    assert LISTING not in index
+    assert index.claim(LISTING)
+    index.complete(LISTING)
+    assert not index.claim('1573434449')
+    assert index.add('https://www.etsy.com/listing/2/other')
+    assert not index.add('https://www.etsy.com/listing/2/renamed')
+    assert len(index) == 2
+
+
+def test_completed_listings_persist_across_runs(tmp_path):
+    path = str(tmp_path / 'index.txt')
+    with ListingIndex(path) as index:
+        index.update([LISTING, 'https://www.etsy.com/listing/2/other'])
+        index.claim('https://www.etsy.com/listing/3/claimed') # never completed
+
+    with ListingIndex(path) as index:
+        assert LISTING in index
+        assert '2' in index
+        assert '3' not in index
+        assert len(index) == 2
+
+
+def test_scrape_products_skips_indexed_listings(server, transport, make_store):
+    urls = [server.product_url(url) for url in make_store().parse_product_urls()[:6]]
+    index = ListingIndex()
+    index.add(urls[0])
+
+    results = list(scrape_products(urls + [urls[1] + '?ref=x'], max_workers=4, transport=transport, index=index))
+
+    assert sorted(result.url for result in results) == sorted(urls[1:])
+    assert all(result.ok for result in results)
+    assert len(index) == 6
+
+
+@pytest.mark.parametrize('scrape', ['products', 'store'])
+def test_closing_early_only_keeps_delivered_listings(scrape, server, transport, make_store, tmp_path):
+    path = str(tmp_path / 'index.txt')
+    store = make_store()
+    index = ListingIndex(path)
+    if scrape == 'products':
+        urls = [server.product_url(url) for url in make_store().parse_product_urls()[:40]]
+        results = scrape_products(urls, max_workers=8, transport=transport, index=index)
+    else:
+        results = scrape_store_products(store, max_workers=8, index=index)
+
+    delivered = list(itertools.islice(results, 10))
+    results.close()
+    index.close()
+
+    assert all(result.ok for result in delivered)
+    assert len(index) == 10 # nothing left claimed and nothing completed that wasn't handed over
+    with open(path) as file:
+        assert len(file.read().split()) == 10
+
+    with ListingIndex(path) as again: # the next run fetches everything that wasn't delivered
+        for result in delivered:
+            assert result.url in again
+        assert len(again) == 10
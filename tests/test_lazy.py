@@ -0,0 +1,90 @@
+import pytest
+from EtsyScraperLib import Product
+from EtsyScraperLib.lazy import is_loaded
+from tests.conftest import counter
+
+
+STORE_FIELDS = ('store_description', 'store_location', 'store_logo', 'store_banner', 'sales_quantity',
+                'product_quantity', 'review_rating', 'review_quantity')
+PRODUCT_FIELDS = ('title', 'price', 'currency', 'amount', 'description', 'review_quantity', 'media_urls')
+
+
+@pytest.fixture
+def connected_store(make_store):
+    store = make_store()
+    store.connect()
+    store.get_all_data()
+    return store
+
+
+@pytest.fixture
+def product_url(server, make_store):
+    return server.product_url(make_store().parse_product_urls()[0])
+
+
+def test_store_get_all_data_connects_first(make_store, connected_store):
+    store = make_store()
+    store.get_all_data()
+
+    assert store.snapshot().to_dict() == connected_store.snapshot().to_dict()
+    assert store.store_description and store.store_location and store.sales_quantity
+    assert counter('selector_failures.store.description') == 0
+
+
+def test_store_getters_and_lazy_reads_agree(make_store, connected_store):
+    getter = make_store()
+    assert getter.get_location() == connected_store.store_location
+    assert getter.get_sales_quantity() == connected_store.sales_quantity
+
+    lazy = make_store()
+    for field in STORE_FIELDS:
+        assert getattr(lazy, field) == getattr(connected_store, field), field
+    assert len(lazy.listings) == len(connected_store.listings)
+
+
+def test_store_page_is_fetched_once_however_fields_are_read(server, make_store):
+    store = make_store()
+    store.store_location
+    store.get_description()
+    store.get_all_data()
+    pages = server.requests
+
+    store.store_banner
+    store.get_logo()
+    assert server.requests == pages
+    assert pages == 1 + len(store.page_fingerprints) # the shop page and each listing page
+
+
+def test_unread_fields_stay_unloaded(server, make_store):
+    store = make_store()
+    assert not is_loaded(store, 'store_location')
+    assert server.requests == 0
+
+    store.store_location
+    assert is_loaded(store, 'store_location')
+    assert not is_loaded(store, 'listings')
+    assert server.requests == 1
+
+
+@pytest.mark.parametrize('structured', [True, False])
+def test_product_get_all_data_connects_first(product_url, transport, structured):
+    connected = Product(product_url, transport=transport, structured=structured)
+    connected.connect()
+    connected.get_all_data()
+
+    product = Product(product_url, transport=transport, structured=structured)
+    product.get_all_data()
+
+    assert product.to_dict() == connected.to_dict()
+    assert product.title and product.price and product.media_urls
+
+
+@pytest.mark.parametrize('structured', [True, False])
+def test_product_getters_and_lazy_reads_agree(product_url, transport, structured):
+    connected = Product(product_url, transport=transport, structured=structured)
+    connected.get_all_data()
+
+    assert Product(product_url, transport=transport, structured=structured).get_price() == connected.price
+    lazy = Product(product_url, transport=transport, structured=structured)
+    for field in PRODUCT_FIELDS:
+        assert getattr(lazy, field) == getattr(connected, field), field
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import requests
+from EtsyScraperLib import MediaStore
+from tests.conftest import counter
+
+
+BODY = os.urandom(50000)
+URL = 'https://i.etsystatic.com/1/il_fullxfull.1.jpg'
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: bytes, headers: dict = None, fail_after: int = None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.fail_after = fail_after
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ConnectionError('connection dropped')
+            yield self.body[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def close(self):
+        pass
+
+
+class RangeTransport:
+    def __init__(self, ranges: str = 'honour', bodies: dict = None, fail_first_after: int = None):
+        """
+        Serves media from memory, answering 'Range' requests the way a server configured by 'ranges' would:
+        'honour', 'ignore' (sends the whole file), 'wrong' (sends a different range) or 'always' (only ever sends part).
+        """
+        self.ranges = ranges
+        self.bodies = bodies or {URL: BODY}
+        self.fail_first_after = fail_first_after
+        self.requests = []
+
+    def get(self, url: str, stream: bool = False, headers: dict = None):
+        self.requests.append(dict(headers or {}))
+        body = self.bodies[url]
+        fail_after, self.fail_first_after = self.fail_first_after, None
+        requested = (headers or {}).get('Range')
+        if self.ranges == 'always':
+            return FakeResponse(206, body[:100], {'Content-Range': f'bytes 0-99/{len(body)}'})
+        if requested and self.ranges != 'ignore':
+            offset = int(requested[len('bytes='):-1])
+            if self.ranges == 'wrong':
+                offset = max(0, offset - 10)
+            if offset >= len(body):
+                return FakeResponse(416, b'')
+            return FakeResponse(206, body[offset:], {'Content-Range': f'bytes {offset}-{len(body) - 1}/{len(body)}'})
+        return FakeResponse(200, body, fail_after=fail_after)
+
+
+def interrupted_store(tmp_path, ranges: str):
+    transport = RangeTransport(ranges, fail_first_after=20000)
+    store = MediaStore(str(tmp_path), transport=transport, chunk_size=4096)
+    assert store.fetch(URL).error is not None
+    return store, transport
+
+
+def stored_objects(tmp_path) -> list:
+    return [name for _, _, names in os.walk(str(tmp_path / 'objects')) for name in names]
+
+
+def test_content_is_stored_once_under_its_hash(tmp_path):
+    other = URL.replace('il_fullxfull.1', 'il_fullxfull.2')
+    transport = RangeTransport(bodies={URL: BODY, other: BODY})
+    with MediaStore(str(tmp_path), transport=transport) as store:
+        first = store.fetch(URL)
+        second = store.fetch(other)
+        again = store.fetch(URL)
+
+    assert first.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert first.path == second.path == again.path
+    assert not again.downloaded
+    assert len(transport.requests) == 2
+    assert stored_objects(tmp_path) == [first.sha256 + '.jpg']
+    assert counter('media_deduplicated') == 1
+
+    with MediaStore(str(tmp_path), transport=transport) as store: # the index is read back
+        assert store.lookup(URL).path == first.path
+        assert store.fetch(other).sha256 == first.sha256
+    assert len(transport.requests) == 2
+
+
+def test_interrupted_download_is_resumed(tmp_path):
+    store, transport = interrupted_store(tmp_path, 'honour')
+
+    result = store.fetch(URL)
+    store.close()
+
+    assert result.ok
+    assert transport.requests[1]['Range'].startswith('bytes=') and transport.requests[1]['Range'] != 'bytes=0-'
+    with open(result.path, 'rb') as file:
+        assert file.read() == BODY
+    assert counter('media_resumed') == 1
+
+
+def test_whole_file_replaces_the_partial_file_when_the_range_is_ignored(tmp_path):
+    store, transport = interrupted_store(tmp_path, 'ignore')
+
+    result = store.fetch(URL)
+    store.close()
+
+    with open(result.path, 'rb') as file:
+        assert file.read() == BODY
+    assert counter('media_resumed') == 0
+
+
+def test_range_that_doesnt_continue_the_partial_file_is_fetched_again(tmp_path):
+    store, transport = interrupted_store(tmp_path, 'wrong')
+
+    result = store.fetch(URL)
+    store.close()
+
+    assert 'Range' in transport.requests[1] and 'Range' not in transport.requests[2]
+    assert result.sha256 == hashlib.sha256(BODY).hexdigest()
+    with open(result.path, 'rb') as file:
+        assert file.read() == BODY
+    assert counter('media_range_mismatches') == 1
+
+
+def test_partial_content_is_never_stored_as_the_whole_file(tmp_path):
+    store, transport = interrupted_store(tmp_path, 'always')
+
+    result = store.fetch(URL)
+    store.close()
+
+    assert result.error is not None
+    assert stored_objects(tmp_path) == []
+    assert os.listdir(str(tmp_path / 'partial')) == []
+
+
+def test_download_fetches_each_url_once(tmp_path):
+    urls = [URL.replace('.1.jpg', f'.{i}.jpg') for i in range(5)]
+    transport = RangeTransport(bodies={url: os.urandom(1000) for url in urls})
+    with MediaStore(str(tmp_path), transport=transport, max_workers=3) as store:
+        results = list(store.download(urls + urls[:3]))
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.ok for result in results)
+    assert len(transport.requests) == 5
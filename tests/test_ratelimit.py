@@ -0,0 +1,96 @@
+import time
+import random
+from email.utils import formatdate
+import pytest
+from benchmarks.server import StandInServer
+from EtsyScraperLib import RateLimiter, RetryPolicy
+from EtsyScraperLib.ratelimit import parse_retry_after
+from tests.conftest import StandInTransport, counter
+
+
+URL = 'https://www.etsy.com/shop/TestStore'
+
+
+def test_retry_after_is_read_as_seconds_or_a_date():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('-3') == 0.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_grows_exponentially_up_to_the_cap():
+    policy = RetryPolicy(backoff=0.5, max_backoff=3.0)
+    random.seed(0)
+    for attempt in range(8):
+        ceiling = min(3.0, 0.5 * 2 ** attempt)
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling * 0.9 # full jitter reaches the ceiling
+
+
+def test_backoff_always_honours_retry_after():
+    policy = RetryPolicy(backoff=0.1, max_backoff=0.2)
+    assert all(policy.delay(0, retry_after=7.0) >= 7.0 for _ in range(50))
+
+
+def test_throttling_cuts_the_rate_and_success_restores_it():
+    limiter = RateLimiter(rate=4.0, min_rate=1.0, max_rate=5.0, increase=0.5, decrease=0.5)
+
+    limiter.feedback(URL, 429)
+    assert limiter.current_rate(URL) == 2.0
+    limiter.feedback(URL, 503)
+    limiter.feedback(URL, 503)
+    assert limiter.current_rate(URL) == 1.0 # never below min_rate
+
+    for _ in range(20):
+        limiter.feedback(URL, 200)
+    assert limiter.current_rate(URL) == 5.0 # never above max_rate
+    assert limiter.current_rate('https://i.etsystatic.com/a.jpg') == 4.0 # each host has its own bucket
+
+
+def test_requests_are_spaced_out_past_the_burst():
+    limiter = RateLimiter(rate=20.0, burst=1.0)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire(URL)
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_retry_after_blocks_the_host():
+    limiter = RateLimiter(rate=100.0)
+    limiter.feedback(URL, 429, retry_after=0.3)
+    start = time.monotonic()
+    limiter.acquire(URL)
+    assert time.monotonic() - start >= 0.25
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transport_retries_throttled_requests_then_gives_up(status):
+    with StandInServer(error_rate=1.0, error_status=status) as server:
+        transport = StandInTransport(server, retry=RetryPolicy(max_retries=2, backoff=0.01, max_backoff=0.02))
+        response = transport.get(server.store_url('TestStore'))
+        transport.close()
+
+    assert response.status_code == status
+    assert server.requests == 3
+    assert counter('retries') == 2
+    assert counter('throttled') == 2
+
+
+def test_transport_recovers_from_intermittent_errors():
+    with StandInServer(error_rate=0.5, seed=3) as server:
+        transport = StandInTransport(server, retry=RetryPolicy(max_retries=10, backoff=0.001, max_backoff=0.005))
+        statuses = [transport.get(server.store_url('TestStore')).status_code for _ in range(10)]
+        transport.close()
+
+    assert statuses == [200] * 10
+    assert server.errors > 0
+    assert counter('retries') == server.errors
+
+
+def test_client_errors_are_not_retried(server, make_transport):
+    transport = make_transport(retry=RetryPolicy(max_retries=3, backoff=0.001))
+    response = transport.get(f'{server.url}/missing')
+    assert response.status_code == 404
+    assert server.requests == 1